@@ -0,0 +1,142 @@
+"""
+Adaptive choice of the mesh size for a target accuracy of the first modes.
+
+The domain is solved on meshes refined by a constant factor, and the
+discretization error of the first eigenvalues is estimated by Richardson
+extrapolation over the last three of them. Refinement stops at the first mesh
+whose estimated error is below the tolerance. Each solve is warm-started from
+the eigenvectors of the previous mesh, interpolated onto the new one.
+
+gmsh meshes are unstructured, so halving ``mesh_size`` only roughly halves the
+element size. The observed convergence order is therefore estimated from the
+data rather than assumed.
+"""
+
+import numpy as np
+
+from .constants import MESH_ELEMENT_ORDER
+from .eigensolvers import solve_eigenproblem
+from .fem_solver import assemble_system
+from .mesh_transfer import interpolate_modes
+from .utils import generate_solution_filenames
+
+DEFAULT_MESH_SIZE = 0.1  # as in the isospectral geometries
+# eigenvalue errors of elements of order p go as h^(2p) for smooth modes
+NOMINAL_ORDER = 2 * MESH_ELEMENT_ORDER
+
+
+def richardson_estimate(eigvals_coarse, eigvals_mid, eigvals_fine, refinement):
+    """
+    Returns the extrapolated eigenvalues, the estimated relative error of the
+    finest ones and the observed convergence orders, from three meshes with
+    sizes h * refinement^2, h * refinement and h.
+
+    Modes whose differences do not shrink with h (not in the asymptotic range
+    yet) get the difference between the two finest meshes as error estimate.
+    """
+    diff_coarse = eigvals_mid - eigvals_coarse
+    diff_fine = eigvals_fine - eigvals_mid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = diff_coarse / diff_fine
+    asymptotic = np.isfinite(ratio) & (ratio > 1)
+    order = np.full(len(ratio), np.nan)
+    order[asymptotic] = np.log(ratio[asymptotic]) / np.log(refinement)
+    # unstructured meshes and corner singularities scatter the observed order
+    order_used = np.clip(np.nan_to_num(order, nan=NOMINAL_ORDER), 1, NOMINAL_ORDER)
+
+    extrapolated = eigvals_fine + diff_fine / (refinement**order_used - 1)
+    error = np.abs(extrapolated - eigvals_fine) / np.abs(extrapolated)
+    error[~asymptotic] = np.abs(diff_fine[~asymptotic] / eigvals_fine[~asymptotic])
+    return extrapolated, error, order
+
+
+def _solve_level(geometry_type, params, n_modes, solver, previous):
+    "Solves the first modes on one mesh, warm-started from the previous level"
+    mesh_file = generate_solution_filenames(geometry_type, params)["mesh"]
+    stiff_mat, mass_mat, bc_array, nodes, _ = assemble_system(
+        geometry_type, params, mesh_file
+    )
+    initial_guess = None
+    if previous is not None:
+        initial_guess = interpolate_modes(
+            previous["nodes"],
+            previous["bc_array"],
+            previous["eigvecs"],
+            nodes,
+            bc_array,
+        )
+    eigvals, eigvecs = solve_eigenproblem(
+        stiff_mat,
+        mass_mat,
+        n_modes=n_modes,
+        solver=solver,
+        initial_guess=initial_guess,
+    )
+    return {
+        "mesh_size": params["mesh_size"],
+        "neq": stiff_mat.shape[0],
+        "eigvals": eigvals,
+        "eigvecs": eigvecs,
+        "bc_array": bc_array,
+        "nodes": nodes,
+    }
+
+
+def select_mesh_size(
+    geometry_type: str,
+    params: dict,
+    n_modes: int = 10,
+    rtol: float = 1e-3,
+    refinement: float = 1.5,
+    max_levels: int = 6,
+    solver: str = "auto",
+):
+    """
+    Returns the coarsest mesh size whose first ``n_modes`` eigenvalues have an
+    estimated relative discretization error below ``rtol``.
+
+    Refinement starts from ``params["mesh_size"]`` and divides it by
+    ``refinement`` at each level, up to ``max_levels`` meshes. The result is a
+    dict with the chosen ``mesh_size``, whether the tolerance was ``converged``,
+    the ``extrapolated`` eigenvalues and their estimated ``error`` on the chosen
+    mesh, the observed ``order`` and the mesh size, DOF count and eigenvalues
+    of every ``level`` solved. If the tolerance is not met, the finest mesh is
+    returned with ``converged`` False.
+    """
+    mesh_size = params.get("mesh_size", DEFAULT_MESH_SIZE)
+    levels = []
+    previous = None
+    for _ in range(max_levels):
+        level_params = {**params, "mesh_size": mesh_size}
+        previous = _solve_level(geometry_type, level_params, n_modes, solver, previous)
+        levels.append({key: previous[key] for key in ("mesh_size", "neq", "eigvals")})
+        mesh_size /= refinement
+        if len(levels) < 3:
+            continue
+
+        extrapolated, error, order = richardson_estimate(
+            *(level["eigvals"][:n_modes] for level in levels[-3:]), refinement
+        )
+        # the middle mesh may already be accurate enough, its error estimated
+        # against the same extrapolation
+        error_mid = np.abs(extrapolated - levels[-2]["eigvals"][:n_modes])
+        error_mid /= np.abs(extrapolated)
+        if np.max(error_mid) <= rtol:
+            chosen, error, converged = levels[-2], error_mid, True
+            break
+        if np.max(error) <= rtol:
+            chosen, converged = levels[-1], True
+            break
+    else:
+        chosen, converged = levels[-1], False
+        if len(levels) < 3:
+            extrapolated = error = order = None
+
+    return {
+        "mesh_size": chosen["mesh_size"],
+        "converged": bool(converged),
+        "extrapolated": extrapolated,
+        "error": error,
+        "order": order,
+        "levels": levels,
+    }
@@ -0,0 +1,143 @@
+"""
+Vectorized assembly of stiffness and mass matrices for 6-node triangles.
+
+Reproduces ``solidspy.assemutil.assembler`` with ``uel=elast_tri6``: same
+shape functions, quadrature and constitutive matrix, but the element matrices
+of the whole mesh are integrated at once and scattered in a single COO build.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+QUADRATURE_ORDER = 3  # as in elast_tri6
+
+
+def _reference_shape_functions():
+    "Returns the quadrature weights, N (npts, 6) and dN/dr (npts, 2, 6)"
+    # solidspy imports its GUI and matplotlib, so only when assembling
+    import solidspy.femutil as fem
+    import solidspy.gaussutil as gau
+
+    gpts, gwts = gau.gauss_tri(order=QUADRATURE_ORDER)
+    Ns, dNdrs = zip(*[fem.shape_tri6(r, s) for r, s in gpts])
+    return gwts, np.array(Ns), np.array(dNdrs)
+
+
+def _element_kinematics(coords):
+    """
+    Returns the quadrature factors (npts, nels), the interpolation matrices H
+    (npts, 2, 12) and the strain-displacement matrices B (npts, nels, 3, 12).
+    """
+    gwts, Ns, dNdrs = _reference_shape_functions()
+    nels = coords.shape[0]
+
+    # Jacobians (npts, nels, 2, 2) and their inverses, as in femutil.jacoper
+    jaco = np.einsum("pij,ejk->peik", dNdrs, coords)
+    det = np.linalg.det(jaco)
+    if np.any(np.isclose(np.abs(det), 0.0)):
+        raise ValueError("Jacobian close to zero. Check the shape of your elements!")
+    if np.any(det < 0.0):
+        raise ValueError("Jacobian is negative. Check your elements orientation!")
+    dNdx = np.einsum("peij,pjk->peik", np.linalg.inv(jaco), dNdrs)
+
+    npts = len(gwts)
+    H = np.zeros((npts, 2, 12))
+    H[:, 0, 0::2] = Ns
+    H[:, 1, 1::2] = Ns
+    B = np.zeros((npts, nels, 3, 12))
+    B[:, :, 0, 0::2] = dNdx[:, :, 0, :]
+    B[:, :, 1, 1::2] = dNdx[:, :, 1, :]
+    B[:, :, 2, 0::2] = dNdx[:, :, 1, :]
+    B[:, :, 2, 1::2] = dNdx[:, :, 0, :]
+
+    factor = 0.5 * gwts[:, None] * det
+    return factor, H, B
+
+
+def _stiffness(factor, B, C):
+    "Integrates B^T C B, for C (nels, 3, 3) or a single (3, 3) matrix"
+    if C.ndim == 2:
+        return np.einsum("pe,peji,jk,pekl->eil", factor, B, C, B, optimize=True)
+    return np.einsum("pe,peji,ejk,pekl->eil", factor, B, C, B, optimize=True)
+
+
+def _mass(factor, H):
+    "Integrates H^T H, the mass matrices for unit density"
+    return np.einsum("pe,pji,pjl->eil", factor, H, H, optimize=True)
+
+
+def element_matrices_tri6(coords, C, dens):
+    """
+    Returns the stiffness and mass matrices (nels, 12, 12) of every element.
+
+    ``coords`` holds the node coordinates of each element (nels, 6, 2), ``C``
+    its constitutive matrix (nels, 3, 3) and ``dens`` its density (nels,).
+    """
+    factor, H, B = _element_kinematics(coords)
+    return _stiffness(factor, B, C), _mass(factor, H) * dens[:, None, None]
+
+
+def _scatter(assem_op, neq, *element_mats):
+    """
+    Returns the global CSR matrices of the given element matrices. They are all
+    built from the same COO indices, so they share one sparsity pattern.
+    """
+    dme = assem_op[:, :12]
+    shape = element_mats[0].shape
+    rows = np.broadcast_to(dme[:, :, None], shape)
+    cols = np.broadcast_to(dme[:, None, :], shape)
+    active = (rows != -1) & (cols != -1)
+    index = (rows[active], cols[active])
+    return [
+        coo_matrix((mats[active], index), shape=(neq, neq)).tocsr()
+        for mats in element_mats
+    ]
+
+
+def assemble_tri6(elements, mats, nodes, neq, assem_op):
+    """
+    Returns the global stiffness and mass matrices in CSR format.
+
+    Drop-in replacement of ``ass.assembler(..., uel=elast_tri6)`` for meshes
+    made only of 6-node triangles.
+    """
+    import solidspy.femutil as fem
+
+    coords = nodes[elements[:, 3:], 1:3]
+    mat_ids = elements[:, 2]
+    C = np.array([fem.umat(params[:2]) for params in mats])[mat_ids]
+    # density defaults to 1 without a third material column, as in elast_tri6
+    dens = mats[mat_ids, 2] if mats.shape[1] > 2 else np.ones(len(mat_ids))
+    stiff, mass = element_matrices_tri6(coords, C, dens)
+    stiff_mat, mass_mat = _scatter(assem_op, neq, stiff, mass)
+    return stiff_mat, mass_mat
+
+
+# plane stress C = lambda* C_LAMBDA + mu C_MU, where lambda* is the effective
+# plane stress Lame parameter 2 lambda mu / (lambda + 2 mu)
+C_LAMBDA = np.array([[1.0, 1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 0.0, 0.0]])
+C_MU = np.array([[2.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.0, 0.0, 1.0]])
+
+
+def lame_parameters(young, poisson):
+    "Returns the plane stress lambda* and mu, the weights of C_LAMBDA and C_MU"
+    return young * poisson / (1 - poisson**2), young / (2 * (1 + poisson))
+
+
+def assemble_tri6_components(elements, nodes, neq, assem_op):
+    """
+    Returns K_lambda, K_mu and the unit-density M, sharing one sparsity pattern.
+
+    For a homogeneous material K = lambda* K_lambda + mu K_mu and M = rho M_1,
+    so a material can be changed by combining their ``data`` arrays, without
+    integrating the elements again.
+    """
+    coords = nodes[elements[:, 3:], 1:3]
+    factor, H, B = _element_kinematics(coords)
+    return _scatter(
+        assem_op,
+        neq,
+        _stiffness(factor, B, C_LAMBDA),
+        _stiffness(factor, B, C_MU),
+        _mass(factor, H),
+    )
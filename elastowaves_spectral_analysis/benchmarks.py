@@ -0,0 +1,232 @@
+"""
+Benchmarks of each stage of a solve, and their scaling with the mesh size.
+
+Every stage (meshing, DOF numbering, assembly, eigensolve, saving and loading
+the solution) is timed and its peak memory traced with ``tracemalloc``, which
+NumPy reports its array allocations to (SuperLU factors are not traced, they
+are allocated by C code). The import time of the package is measured too, in
+fresh interpreters, along with the heavy backends the import pulls in. Results
+are plain dicts, written as JSON, and can be compared against a stored
+baseline to spot regressions.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from .assembly import assemble_tri6
+from .constants import NODE_REORDERING
+from .eigensolvers import solve_eigenproblem
+from .fem_solver import material_array
+from .gmesher import ensure_session, generate_mesh, mesh_to_arrays
+from .instrumentation import record_stages, stage
+from .reordering import reorder_mesh
+from .utils import SOLUTION_ARRAYS, load_solution_files, save_solution_files
+
+STAGES = ("mesh", "dof_numbering", "assembly", "eigensolve", "save", "load")
+BENCHMARK_N_MODES = 20  # modes solved for, the full spectrum would dominate
+
+# mesh sizes swept by default, for domains of area of order one
+BENCHMARK_MESH_SIZES = (0.2, 0.1, 0.05)
+BENCHMARK_GEOMETRIES = {
+    "square": {"side": 1.0},
+    "triangle": {"cathetus": 1.5},
+    "circle": {"radius": 0.6},
+    "isospectral_1_1": {},
+    "isospectral_2_1": {},
+}
+
+# modules whose import is timed, and backends they should not import
+IMPORT_MODULES = (
+    "elastowaves_spectral_analysis.fem_solver",
+    "elastowaves_spectral_analysis.sweeps",
+)
+HEAVY_MODULES = ("gmsh", "meshio", "solidspy", "matplotlib")
+IMPORT_REPEATS = 5
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _benchmark_stages(records):
+    "Returns the time, peak memory and other fields of each of ``STAGES``"
+    return {
+        record["stage"]: {key: value for key, value in record.items() if key != "stage"}
+        for record in records
+        if record["stage"] in STAGES
+    }
+
+
+def benchmark_case(geometry_type, params, n_modes=BENCHMARK_N_MODES, solver="auto"):
+    """
+    Runs every stage for one mesh, returning the DOF count and the time and
+    peak memory of each stage. The solution is written to a temporary folder.
+    """
+    import solidspy.assemutil as ass
+
+    ensure_session()  # so the gmsh import is not timed as meshing
+    with record_stages() as records:
+        with stage("mesh"):
+            points, tri6, line3 = generate_mesh(geometry_type, params)
+
+        with stage("dof_numbering"):
+            cons, elements, nodes = mesh_to_arrays(points, tri6, line3)
+            cons, elements, nodes = reorder_mesh(cons, elements, nodes, NODE_REORDERING)
+            assem_op, bc_array, neq = ass.DME(
+                cons, elements, ndof_node=2, ndof_el_max=12
+            )
+
+        with stage("assembly"):
+            stiff_mat, mass_mat = assemble_tri6(
+                elements, material_array(), nodes, neq, assem_op
+            )
+
+        # recorded as the "eigensolve" stage by the solver itself
+        eigvals, eigvecs = solve_eigenproblem(
+            stiff_mat, mass_mat, n_modes=n_modes, solver=solver
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files_dict = {
+                name: os.path.join(tmp_dir, f"{name}.npy") for name in SOLUTION_ARRAYS
+            }
+            with stage("save") as record:
+                save_solution_files(
+                    bc_array, eigvals, eigvecs, nodes, elements, files_dict
+                )
+                record["bytes"] = sum(
+                    os.path.getsize(this_file) for this_file in files_dict.values()
+                )
+            with stage("load"):
+                load_solution_files(files_dict, mmap_mode=None)
+
+    return {
+        "geometry_type": geometry_type,
+        "params": params,
+        "neq": int(neq),
+        "nnz": int(stiff_mat.nnz),
+        "n_modes": len(eigvals),
+        "stages": _benchmark_stages(records),
+    }
+
+
+def import_benchmark(module: str, repeats: int = IMPORT_REPEATS):
+    """
+    Returns the shortest wall time of importing the module in a fresh
+    interpreter over ``repeats`` runs, and the ``HEAVY_MODULES`` it imported.
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'time': elapsed, 'heavy_modules': heavy}))"
+    )
+    python_path = os.pathsep.join(filter(None, [PACKAGE_ROOT, os.getenv("PYTHONPATH")]))
+    env = {**os.environ, "PYTHONPATH": python_path}
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return min(runs, key=lambda run: run["time"])
+
+
+def case_name(case) -> str:
+    "Returns the name a benchmark case is matched with in the baseline"
+    params = ",".join(f"{key}={value}" for key, value in sorted(case["params"].items()))
+    return f"{case['geometry_type']}({params})"
+
+
+def run_benchmarks(
+    geometries=None,
+    mesh_sizes=BENCHMARK_MESH_SIZES,
+    n_modes=BENCHMARK_N_MODES,
+    import_modules=IMPORT_MODULES,
+):
+    """
+    Benchmarks every geometry at every mesh size, and the import of each of
+    ``import_modules``. ``geometries`` maps geometry types to their params but
+    the mesh size, ``BENCHMARK_GEOMETRIES`` by default. Returns the results,
+    with the environment they were run in.
+    """
+    imports = {module: import_benchmark(module) for module in import_modules}
+    geometries = geometries or BENCHMARK_GEOMETRIES
+    cases = []
+    for geometry_type, params in geometries.items():
+        for mesh_size in mesh_sizes:
+            cases.append(
+                benchmark_case(
+                    geometry_type, {**params, "mesh_size": mesh_size}, n_modes
+                )
+            )
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "imports": imports,
+        "cases": {case_name(case): case for case in cases},
+    }
+
+
+def save_results(results, results_file):
+    "Writes benchmark results as JSON"
+    results_dir = os.path.dirname(results_file)
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(results_file) -> dict:
+    "Reads benchmark results written by save_results"
+    with open(results_file) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(
+    results, baseline, rel_tolerance=0.25, min_time=0.05, min_memory=2**20
+):
+    """
+    Returns the regressions of ``results`` against ``baseline``, as a list of
+    ``(case, stage, metric, baseline_value, value)``.
+
+    A stage regresses when its time or peak memory grows by more than
+    ``rel_tolerance`` and by more than ``min_time`` seconds or ``min_memory``
+    bytes, so that noise on very short stages is not reported. Import times
+    are reported as the "import" stage of the module. Cases missing from the
+    baseline are skipped.
+    """
+    min_change = {"time": min_time, "peak_memory": min_memory}
+    regressions = []
+    baseline_imports = baseline.get("imports", {})
+    for module, record in results.get("imports", {}).items():
+        if module not in baseline_imports:
+            continue
+        old, new = baseline_imports[module]["time"], record["time"]
+        if new > old * (1 + rel_tolerance) and new - old > min_time:
+            regressions.append((module, "import", "time", old, new))
+    for name, case in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        baseline_stages = baseline["cases"][name]["stages"]
+        for stage_name, record in case["stages"].items():
+            if stage_name not in baseline_stages:
+                continue
+            for metric, threshold in min_change.items():
+                old, new = baseline_stages[stage_name][metric], record[metric]
+                if new > old * (1 + rel_tolerance) and new - old > threshold:
+                    regressions.append((name, stage_name, metric, old, new))
+    return regressions
@@ -0,0 +1,231 @@
+"""
+Content-addressed keys and an index for the cached meshes and solutions.
+
+A cache key is a hash of the canonical problem spec, so every input that
+changes the result (geometry, params, material, mesh options and spectral
+request) changes the key. The index is a JSON manifest in the solutions
+folder mapping each key to its spec, files, compute time, size and last
+access, which is what the LRU eviction works from. It is updated under a lock
+and replaced in a single step, as several processes may share the store.
+"""
+
+import hashlib
+import json
+import numbers
+import os
+import time
+
+from .constants import (
+    LENGTH_SCALE_PARAMS,
+    MATERIAL_PARAMETERS,
+    MESH_ALGORITHM,
+    MESH_ELEMENT_ORDER,
+    NODE_REORDERING,
+    SIDE_TO_MESH_SIZE_RATIO,
+)
+from .storage import atomic_write_text, key_lock, solutions_folder
+
+INDEX_FILE = "index.json"  # in the solutions folder
+INDEX_LOCK = "index"
+KEY_LENGTH = 16  # hex digits of the sha256 kept in file names
+SIMILARITY_DIGITS = 12  # significant digits of the lengths in similarity keys
+
+
+def _canonical_value(value):
+    "Returns value with every real number as a float, so 1 and 1.0 match"
+    if isinstance(value, dict):
+        return {str(key): _canonical_value(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(val) for val in value]
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def problem_spec(
+    geometry_type,
+    params,
+    n_modes=None,
+    eigval_max=None,
+    solver="auto",
+    material=None,
+    symmetry=False,
+) -> dict:
+    """
+    Returns the canonical spec of the problem, everything the solution depends
+    on. ``material`` defaults to ``MATERIAL_PARAMETERS``, and ``symmetry``
+    tells if the mesh is built from the fundamental sector, see symmetry.py.
+    """
+    mesh = {
+        "algorithm": MESH_ALGORITHM,
+        "element_order": MESH_ELEMENT_ORDER,
+        "reordering": NODE_REORDERING,
+        "side_to_mesh_size_ratio": SIDE_TO_MESH_SIZE_RATIO,
+    }
+    if symmetry:  # only then, so that the keys of full meshes are kept
+        mesh["symmetry"] = True
+    return _canonical_value(
+        {
+            "geometry_type": geometry_type,
+            "params": params,
+            "mesh": mesh,
+            "material": material or MATERIAL_PARAMETERS,
+            "spectrum": {
+                "n_modes": n_modes,
+                "eigval_max": eigval_max,
+                "solver": solver,
+            },
+        }
+    )
+
+
+def mesh_spec(spec: dict) -> dict:
+    "Returns the part of a problem spec the mesh depends on"
+    return {key: spec[key] for key in ("geometry_type", "params", "mesh")}
+
+
+def spec_key(spec: dict) -> str:
+    "Returns the cache key of a spec"
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:KEY_LENGTH]
+
+
+def similarity_key(spec: dict):
+    """
+    Returns a key shared by the specs whose meshes are uniform scalings of each
+    other, or None if the geometry has no length scale parameter.
+
+    Every length is divided by the length scale, and rounded to
+    ``SIMILARITY_DIGITS`` significant digits so that rounding errors of the
+    division do not split similar specs. The spectral request is left out
+    since a scaled spectrum can be truncated to any request.
+    """
+    scale_param = LENGTH_SCALE_PARAMS.get(spec["geometry_type"])
+    if scale_param is None or scale_param not in spec["params"]:
+        return None
+    scale = spec["params"][scale_param]
+    unit_spec = {key: value for key, value in spec.items() if key != "spectrum"}
+    unit_spec["params"] = {
+        key: float(f"{value / scale:.{SIMILARITY_DIGITS}g}")
+        for key, value in spec["params"].items()
+    }
+    return spec_key(unit_spec)
+
+
+def length_scale(spec: dict) -> float:
+    "Returns the value of the length scale parameter of a spec"
+    return spec["params"][LENGTH_SCALE_PARAMS[spec["geometry_type"]]]
+
+
+def _spectrum_covers(reference, request, eigval_factor):
+    """
+    Checks if the modes of a reference spectral request include the requested
+    ones, the requested eigenvalues being ``eigval_factor`` times the reference
+    ones.
+    """
+    if reference["n_modes"] is not None and (
+        request["n_modes"] is None or request["n_modes"] > reference["n_modes"]
+    ):
+        return False
+    if reference["eigval_max"] is not None and (
+        request["eigval_max"] is None
+        or request["eigval_max"] / eigval_factor > reference["eigval_max"]
+    ):
+        return False
+    return True
+
+
+def _index_file(index_file=None):
+    "Returns the given index file, or the one of the store"
+    return index_file or os.path.join(solutions_folder(), INDEX_FILE)
+
+
+def find_similar_entry(spec: dict, index_file=None, eigvecs=True):
+    """
+    Returns the key and spec of an indexed solution whose mesh is a uniform
+    scaling of the one of ``spec`` and whose modes cover the requested ones,
+    or None if there is none. With ``eigvecs`` False, entries holding only
+    eigenvalues qualify too.
+    """
+    key = similarity_key(spec)
+    if key is None:
+        return None
+    for entry_key, entry in load_index(index_file).items():
+        entry_spec = entry["spec"]
+        if similarity_key(entry_spec) != key:
+            continue
+        if eigvecs and not entry.get("eigvecs", True):
+            continue
+        scale = length_scale(spec) / length_scale(entry_spec)
+        if _spectrum_covers(entry_spec["spectrum"], spec["spectrum"], scale**-2):
+            return entry_key, entry_spec
+    return None
+
+
+def load_index(index_file=None) -> dict:
+    "Loads the cache index, empty if it does not exist yet"
+    index_file = _index_file(index_file)
+    if not os.path.exists(index_file):
+        return {}
+    with open(index_file) as f:
+        return json.load(f)
+
+
+def save_index(index: dict, index_file=None):
+    "Saves the cache index, replacing the old one in a single step"
+    text = json.dumps(index, indent=2, sort_keys=True)
+    atomic_write_text(_index_file(index_file), text)
+
+
+def record_entry(key, spec, files, compute_time, index_file=None, eigvecs=True):
+    """
+    Adds a freshly computed solution to the index, ``eigvecs`` telling if it
+    holds the eigenvectors or only the eigenvalues.
+    """
+    with key_lock(INDEX_LOCK):
+        index = load_index(index_file)
+        index[key] = {
+            "spec": spec,
+            "eigvecs": eigvecs,
+            "files": sorted(files),
+            "compute_time": compute_time,
+            "size": sum(os.path.getsize(this_file) for this_file in files),
+            "last_access": time.time(),
+        }
+        save_index(index, index_file)
+
+
+def touch_entry(key, index_file=None):
+    "Marks an indexed solution as just used"
+    with key_lock(INDEX_LOCK):
+        index = load_index(index_file)
+        if key in index:
+            index[key]["last_access"] = time.time()
+            save_index(index, index_file)
+
+
+def evict_lru(max_bytes, keep=(), index_file=None):
+    """
+    Deletes the least recently used solutions, but those in ``keep``, until the
+    indexed ones take at most ``max_bytes``. Returns the evicted keys.
+    """
+    with key_lock(INDEX_LOCK):
+        return _evict_lru(max_bytes, keep, index_file)
+
+
+def _evict_lru(max_bytes, keep, index_file):
+    index = load_index(index_file)
+    total_size = sum(entry["size"] for entry in index.values())
+    evicted = []
+    for key in sorted(index, key=lambda key: index[key]["last_access"]):
+        if total_size <= max_bytes:
+            break
+        if key in keep:
+            continue
+        for this_file in index[key]["files"]:
+            if os.path.exists(this_file):
+                os.remove(this_file)
+        total_size -= index.pop(key)["size"]
+        evicted.append(key)
+    save_index(index, index_file)
+    return evicted
@@ -1,5 +1,3 @@
-import os
-
 MATERIAL_PARAMETERS = {
     "E": 1.0,
     "NU": 0.3,
@@ -8,15 +6,35 @@ MATERIAL_PARAMETERS = {
 
 SIDE_TO_MESH_SIZE_RATIO = 10
 
-MESHES_FOLDER = "data/meshes"
-SOLUTIONS_FOLDER = "data/solutions"
-IMAGES_FOLDER = "data/images"
-
-# Create the folders if they don't exist
-current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-abs_meshes_folder = os.path.join(current_dir, MESHES_FOLDER)
-abs_solutions_folder = os.path.join(current_dir, SOLUTIONS_FOLDER)
-abs_images_folder = os.path.join(current_dir, IMAGES_FOLDER)
-os.makedirs(abs_meshes_folder, exist_ok=True)
-os.makedirs(abs_solutions_folder, exist_ok=True)
-os.makedirs(abs_images_folder, exist_ok=True)
+MESH_ALGORITHM = 2  # gmsh Delaunay, triangular mesh
+MESH_ELEMENT_ORDER = 2  # quadratic elements, as expected by elast_tri6
+# parameter that sets the length scale of each geometry, every other parameter
+# is a length too, so scaling it scales the whole mesh, see cache.similarity_key
+LENGTH_SCALE_PARAMS = {"square": "side", "triangle": "cathetus", "circle": "radius"}
+
+NODE_REORDERING = "rcm"  # reverse Cuthill-McKee before DOF numbering, or None
+WRITE_MESH_FILES = False  # meshes are cached as arrays, .msh files are optional
+
+# modes asked for in the first shift-invert pass when only eigval_max is given
+INITIAL_MODES_GUESS = 50
+
+# eigensolver selection, see eigensolvers.choose_eigensolver
+DENSE_MAX_DOFS = 5000  # dense K and M take 2 * 8 * n^2 bytes
+DENSE_MODES_FRACTION = 0.2  # share of modes above which a dense solve pays off
+SPARSE_DIRECT_MAX_DOFS = 200_000  # beyond this, LU fill-in gets too large
+SLICING_MIN_MODES = 500  # requests this large are split in spectrum slices
+
+# size bound for the solutions folder, least recently used entries are evicted first
+SOLUTIONS_MAX_BYTES = None  # None means unbounded
+SOLUTIONS_MAX_BYTES_ENV = "ELASTOWAVES_SOLUTIONS_MAX_BYTES"  # overrides it
+
+# store of meshes and solutions, which can be shared, see storage.py
+DATA_ROOT = "data"  # relative to the working directory
+DATA_ROOT_ENV = "ELASTOWAVES_DATA_ROOT"  # environment variable overriding it
+MESHES_FOLDER = "meshes"  # under the data root
+SOLUTIONS_FOLDER = "solutions"  # under the data root
+
+IMAGES_FOLDER = "images"  # under the data root
+SWEEPS_FOLDER = "sweeps"  # manifests of resumable sweeps, see manifest.py
+BENCHMARKS_FOLDER = "benchmarks"  # under the data root
+# folders are created when written to, or all at once with utils.init_workspace
@@ -0,0 +1,458 @@
+"""
+Eigensolver backends for the generalized problem K v = lambda M v.
+
+Every backend takes the sparse stiffness and mass matrices plus the spectral
+request (``n_modes`` and/or ``eigval_max``) and returns the eigenvalues in
+ascending order, together with the eigenvectors unless ``return_eigvecs`` is
+False, in which case ``None`` is returned in their place. An ``initial_guess``
+of approximate eigenvectors, as columns, warm-starts the backends in
+``WARM_STARTED``; dense solves and spectrum slicing ignore it. Backends also
+take an ``info`` dict, where the iterative ones count their
+``operator_applications`` (solves with the shift-invert factorization, or
+products with K) or ``iterations`` (LOBPCG), so that the savings of a warm
+start can be measured.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, parent_process
+
+import numpy as np
+from scipy.linalg import eigh
+from scipy.sparse.linalg import LinearOperator, eigsh, lobpcg as _lobpcg, spilu, splu
+
+from .constants import (
+    DENSE_MAX_DOFS,
+    DENSE_MODES_FRACTION,
+    INITIAL_MODES_GUESS,
+    SLICING_MIN_MODES,
+    SPARSE_DIRECT_MAX_DOFS,
+)
+from .instrumentation import stage
+
+
+def default_workers() -> int:
+    """
+    Returns the number of processes a solve may run in parallel: one per CPU,
+    or one in a worker process, whose parent already runs in parallel.
+    """
+    return 1 if parent_process() is not None else os.cpu_count()
+
+
+def _sort_modes(eigvals, eigvecs=None):
+    "Returns eigenpairs sorted by ascending eigenvalue"
+    order = np.argsort(eigvals)
+    if eigvecs is None:
+        return eigvals[order], None
+    return eigvals[order], eigvecs[:, order]
+
+
+def _truncate_modes(eigvals, eigvecs, eigval_max):
+    "Drops the modes with eigenvalues at or above eigval_max"
+    if eigval_max is None:
+        return eigvals, eigvecs
+    below = eigvals < eigval_max
+    if eigvecs is None:
+        return eigvals[below], None
+    return eigvals[below], eigvecs[:, below]
+
+
+def _counted(func, info, counter="operator_applications"):
+    "Wraps a function so that each call adds one to ``info[counter]``"
+    info[counter] = info.get(counter, 0)
+
+    def counted_func(x):
+        info[counter] += 1
+        return func(x)
+
+    return counted_func
+
+
+def _shift_invert_operator(stiff_mat, mass_mat, sigma, info=None):
+    """
+    Returns (K - sigma M)^-1 as an operator, backed by a single sparse LU, its
+    applications counted in ``info`` if given.
+    """
+    lu = splu((stiff_mat - sigma * mass_mat).tocsc())
+    solve = lu.solve if info is None else _counted(lu.solve, info)
+    return LinearOperator(stiff_mat.shape, matvec=solve, dtype=stiff_mat.dtype)
+
+
+def _starting_vector(initial_guess):
+    "Returns the ARPACK starting vector, spanning every guessed mode"
+    if initial_guess is None:
+        return None
+    return np.asarray(initial_guess).sum(axis=1)
+
+
+def _grow_until_covered(solve_k, neq, n_modes, eigval_max):
+    """
+    Calls ``solve_k(k)`` with a growing number of modes until ``eigval_max``
+    is covered, or just once when ``n_modes`` is given. Without either, it is
+    called once for every mode ARPACK can return, as in ``arpack``.
+    """
+    if n_modes is None and eigval_max is None:
+        n_modes = neq - 1
+    k = min(n_modes if n_modes is not None else INITIAL_MODES_GUESS, neq - 1)
+    while True:
+        eigvals, eigvecs = solve_k(k)
+        if n_modes is not None or eigvals[-1] >= eigval_max or k == neq - 1:
+            break
+        k = min(2 * k, neq - 1)
+    return _truncate_modes(eigvals, eigvecs, eigval_max)
+
+
+def arpack(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    return_eigvecs=True,
+    initial_guess=None,
+    info=None,
+):
+    "ARPACK in regular mode, asking for the smallest-magnitude modes"
+    neq = stiff_mat.shape[0]
+    k = neq - 1 if n_modes is None else min(n_modes, neq - 1)
+    if info is not None:
+        matvec = _counted(stiff_mat.dot, info)
+        stiff_mat = LinearOperator(stiff_mat.shape, matvec=matvec, dtype=float)
+    result = eigsh(
+        stiff_mat,
+        M=mass_mat,
+        k=k,
+        which="SM",
+        v0=_starting_vector(initial_guess),
+        return_eigenvectors=return_eigvecs,
+    )
+    eigvals, eigvecs = result if return_eigvecs else (result, None)
+    eigvals, eigvecs = _sort_modes(eigvals, eigvecs)
+    return _truncate_modes(eigvals, eigvecs, eigval_max)
+
+
+def shift_invert(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    return_eigvecs=True,
+    initial_guess=None,
+    info=None,
+):
+    """
+    ARPACK in shift-invert mode around zero.
+
+    K is factorized once and the factorization is reused while the number of
+    modes grows until ``eigval_max`` is covered.
+    """
+    neq = stiff_mat.shape[0]
+    sigma = 0.0  # K is positive definite, every boundary node is clamped
+    OPinv = _shift_invert_operator(stiff_mat, mass_mat, sigma, info)
+    v0 = _starting_vector(initial_guess)
+
+    def solve_k(k):
+        result = eigsh(
+            stiff_mat,
+            M=mass_mat,
+            k=k,
+            sigma=sigma,
+            which="LM",
+            OPinv=OPinv,
+            v0=v0,
+            return_eigenvectors=return_eigvecs,
+        )
+        return _sort_modes(*(result if return_eigvecs else (result, None)))
+
+    return _grow_until_covered(solve_k, neq, n_modes, eigval_max)
+
+
+def lobpcg(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    return_eigvecs=True,
+    initial_guess=None,
+    info=None,
+    tol=1e-8,
+    maxiter=500,
+):
+    """
+    LOBPCG preconditioned with an incomplete LU of K.
+
+    Meant for problems too large for a sparse direct factorization and only a
+    few modes; the eigenvectors are always computed by the method itself. The
+    columns of ``initial_guess`` start the block, random ones fill the rest.
+    """
+    neq = stiff_mat.shape[0]
+    ilu = spilu(stiff_mat.tocsc(), drop_tol=1e-5, fill_factor=20)
+    precond = LinearOperator(stiff_mat.shape, matvec=ilu.solve, dtype=stiff_mat.dtype)
+    rng = np.random.default_rng(0)
+
+    def solve_k(k):
+        X = rng.standard_normal((neq, k))
+        if initial_guess is not None:
+            n_guess = min(k, initial_guess.shape[1])
+            X[:, :n_guess] = initial_guess[:, :n_guess]
+        eigvals, eigvecs, *history = _lobpcg(
+            stiff_mat,
+            X,
+            B=mass_mat,
+            M=precond,
+            largest=False,
+            tol=tol,
+            maxiter=maxiter,
+            retResidualNormsHistory=True,
+        )
+        # blocks too large for the matrix are solved densely, with no history
+        if info is not None and history:
+            info["iterations"] = info.get("iterations", 0) + len(history[0])
+        return _sort_modes(eigvals, eigvecs)
+
+    eigvals, eigvecs = _grow_until_covered(solve_k, neq, n_modes, eigval_max)
+    return eigvals, eigvecs if return_eigvecs else None
+
+
+def dense(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    return_eigvecs=True,
+    initial_guess=None,
+    info=None,
+):
+    "Dense symmetric-definite solve with LAPACK, scipy.linalg.eigh(K, M)"
+    subset = {}
+    if n_modes is not None:
+        subset["subset_by_index"] = [0, min(n_modes, stiff_mat.shape[0]) - 1]
+    elif eigval_max is not None:
+        subset["subset_by_value"] = [-np.inf, eigval_max]
+
+    result = eigh(
+        stiff_mat.toarray(),
+        mass_mat.toarray(),
+        eigvals_only=not return_eigvecs,
+        **subset,
+    )
+    eigvals, eigvecs = result if return_eigvecs else (result, None)
+    return _truncate_modes(eigvals, eigvecs, eigval_max)
+
+
+def eigenvalue_count(stiff_mat, mass_mat, sigma):
+    """
+    Returns the number of eigenvalues below ``sigma``.
+
+    By Sylvester's law of inertia it is the number of negative pivots of an
+    LDL^T factorization of K - sigma M, taken here from a sparse LU with a
+    symmetric ordering and no pivoting.
+    """
+    lu = splu(
+        (stiff_mat - sigma * mass_mat).tocsc(),
+        permc_spec="MMD_AT_PLUS_A",
+        diag_pivot_thresh=0.0,
+        options={"SymmetricMode": True},
+    )
+    return int(np.sum(lu.U.diagonal() < 0))
+
+
+def solve_slice(stiff_mat, mass_mat, lower, upper, k, return_eigvecs):
+    """
+    Returns the eigenvalue count below ``upper``, the modes closest to the
+    middle of [lower, upper), asking for more until the interval is covered,
+    and the operator applications it took.
+    """
+    neq = stiff_mat.shape[0]
+    count_upper = eigenvalue_count(stiff_mat, mass_mat, upper)
+    sigma = 0.5 * (lower + upper)
+    info = {}
+    OPinv = _shift_invert_operator(stiff_mat, mass_mat, sigma, info)
+    k = min(max(k, 1), neq - 1)
+    while True:
+        eigvals, eigvecs = eigsh(
+            stiff_mat, M=mass_mat, k=k, sigma=sigma, which="LM", OPinv=OPinv
+        )
+        # the k modes closest to sigma are every mode within their radius
+        radius = np.max(np.abs(eigvals - sigma))
+        if radius >= 0.5 * (upper - lower) or k == neq - 1:
+            break
+        k = min(2 * k, neq - 1)
+    eigvals, eigvecs = _sort_modes(eigvals, eigvecs)
+    eigvecs = eigvecs if return_eigvecs else None
+    return count_upper, eigvals, eigvecs, info["operator_applications"]
+
+
+def take_slice_modes(eigvals, eigvecs, lower, upper, n_slice):
+    """
+    Returns the ``n_slice`` consecutive modes that best fit [lower, upper).
+
+    The count comes from the inertia, so modes at the interval edges, which
+    may be found by both neighbouring slices, are kept by exactly one.
+    """
+    n_slice = min(n_slice, len(eigvals))
+    start = np.searchsorted(eigvals, lower)
+    candidates = [
+        j for j in (start - 1, start, start + 1) if 0 <= j <= len(eigvals) - n_slice
+    ]
+
+    def edge_violation(j):
+        if n_slice == 0:
+            return 0.0
+        return max(0.0, lower - eigvals[j]) + max(0.0, eigvals[j + n_slice - 1] - upper)
+
+    j = min(candidates, key=edge_violation)
+    taken = slice(j, j + n_slice)
+    return eigvals[taken], None if eigvecs is None else eigvecs[:, taken]
+
+
+def spectrum_slicing(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    return_eigvecs=True,
+    initial_guess=None,
+    info=None,
+    workers=None,
+):
+    """
+    Shift-invert over [0, eigval_max) split in intervals solved in parallel.
+
+    For ``n_modes`` alone, eigval_max is doubled until the inertia counts that
+    many modes below it. Eigenvalue counts grow linearly with the eigenvalue in
+    2D (Weyl's law), so equal-width intervals hold a similar number of modes.
+    Each interval is solved in its own process, and the modes of each one are
+    picked by the inertia counts at the interval edges, which merges the slices
+    without duplicated or missing modes. ``initial_guess`` is ignored. The
+    slices are solved by up to ``workers`` processes, see ``default_workers``.
+    """
+    if n_modes is None and eigval_max is None:
+        raise ValueError("Spectrum slicing needs n_modes or eigval_max")
+    neq = stiff_mat.shape[0]
+    requested_eigval_max = eigval_max
+
+    if eigval_max is None:
+        eigval_max = eigsh(stiff_mat, M=mass_mat, k=1, sigma=0.0, which="LM")[0][0]
+        eigval_max *= n_modes  # Weyl's law guess
+        while eigenvalue_count(stiff_mat, mass_mat, eigval_max) < min(n_modes, neq):
+            eigval_max *= 2
+    n_total = eigenvalue_count(stiff_mat, mass_mat, eigval_max)
+
+    workers = workers or default_workers()
+    n_slices = max(1, min(workers, n_total // INITIAL_MODES_GUESS))
+    edges = np.linspace(0.0, eigval_max, n_slices + 1)
+    k_guess = int(np.ceil(1.2 * n_total / n_slices)) + 1
+    args = [
+        (stiff_mat, mass_mat, edges[i], edges[i + 1], k_guess, return_eigvecs)
+        for i in range(n_slices)
+    ]
+    if n_slices == 1:
+        results = [solve_slice(*args[0])]
+    else:
+        with ProcessPoolExecutor(n_slices, mp_context=get_context("spawn")) as pool:
+            results = list(pool.map(solve_slice, *zip(*args)))
+
+    eigvals, eigvecs = [], []
+    count_lower = 0
+    for i, (count_upper, slice_vals, slice_vecs, _) in enumerate(results):
+        slice_vals, slice_vecs = take_slice_modes(
+            slice_vals, slice_vecs, edges[i], edges[i + 1], count_upper - count_lower
+        )
+        eigvals.append(slice_vals)
+        eigvecs.append(slice_vecs)
+        count_lower = count_upper
+
+    if info is not None:
+        info["slices"] = n_slices
+        info["operator_applications"] = sum(result[3] for result in results)
+
+    eigvals = np.concatenate(eigvals)
+    eigvecs = np.hstack(eigvecs) if return_eigvecs else None
+    if n_modes is not None:
+        eigvals = eigvals[:n_modes]
+        eigvecs = None if eigvecs is None else eigvecs[:, :n_modes]
+    return _truncate_modes(eigvals, eigvecs, requested_eigval_max)
+
+
+EIGENSOLVERS = {
+    "arpack": arpack,
+    "shift_invert": shift_invert,
+    "lobpcg": lobpcg,
+    "dense": dense,
+    "slicing": spectrum_slicing,
+}
+WARM_STARTED = ("arpack", "shift_invert", "lobpcg")  # backends using initial_guess
+
+
+def uses_initial_guess(solver, n_modes=None, eigval_max=None):
+    """
+    Tells whether the backend gains from an initial guess for the request.
+    ARPACK asked for the full spectrum finds every mode whatever it starts from.
+    """
+    if solver == "arpack":
+        return n_modes is not None or eigval_max is not None
+    return solver in WARM_STARTED
+
+
+def choose_eigensolver(neq, n_modes=None, eigval_max=None, workers=None):
+    """
+    Returns the name of the backend suited to the problem size and request.
+
+    Full spectra, and requests for a large share of the modes, go to the dense
+    solver while the matrices fit in memory. Partial spectra use shift-invert,
+    or spectrum slicing when they hold many modes and ``workers`` processes
+    can solve its slices in parallel, or LOBPCG once a sparse direct
+    factorization becomes too expensive.
+    """
+    full_spectrum = n_modes is None and eigval_max is None
+    many_modes = n_modes is not None and n_modes > DENSE_MODES_FRACTION * neq
+    if neq <= DENSE_MAX_DOFS and (full_spectrum or many_modes):
+        return "dense"
+    if full_spectrum:
+        return "arpack"
+    if neq > SPARSE_DIRECT_MAX_DOFS:
+        return "lobpcg"
+    parallel = (workers or default_workers()) > 1
+    if n_modes is not None and n_modes >= SLICING_MIN_MODES and parallel:
+        return "slicing"
+    return "shift_invert"
+
+
+def solve_eigenproblem(
+    stiff_mat,
+    mass_mat,
+    n_modes=None,
+    eigval_max=None,
+    solver="auto",
+    return_eigvecs=True,
+    initial_guess=None,
+    workers=None,
+):
+    """
+    Solves K v = lambda M v with the given backend, or picks one with 'auto'.
+    Spectrum slicing runs up to ``workers`` processes, see ``default_workers``.
+
+    The solve is recorded as the "eigensolve" stage, see ``instrumentation``,
+    with the backend used, whether it was warm-started and its iteration count.
+    """
+    neq = stiff_mat.shape[0]
+    if solver == "auto":
+        solver = choose_eigensolver(neq, n_modes, eigval_max, workers)
+    if solver not in EIGENSOLVERS:
+        raise ValueError(f"Unknown eigensolver: {solver}")
+    warm_start = initial_guess is not None and solver in WARM_STARTED
+    # only slicing runs in parallel
+    options = {"workers": workers} if solver == "slicing" else {}
+    with stage("eigensolve", neq=neq, solver=solver, warm_start=warm_start) as info:
+        eigvals, eigvecs = EIGENSOLVERS[solver](
+            stiff_mat,
+            mass_mat,
+            n_modes=n_modes,
+            eigval_max=eigval_max,
+            return_eigvecs=return_eigvecs,
+            initial_guess=initial_guess,
+            info=info,
+            **options,
+        )
+        info["n_modes"] = len(eigvals)
+    return eigvals, eigvecs
@@ -2,86 +2,640 @@
 Solve for wave propagation in classical mechanics in the given domain.
 """
 
-import meshio
+import os
+import time
+
 import numpy as np
-import solidspy.assemutil as ass
-from scipy.sparse.linalg import eigsh
-from solidspy_uels.solidspy_uels import elast_tri6
 
-from .constants import MATERIAL_PARAMETERS
-from .gmesher import create_mesh
+from .assembly import assemble_tri6, assemble_tri6_components, lame_parameters
+from .cache import (
+    evict_lru,
+    find_similar_entry,
+    length_scale,
+    problem_spec,
+    record_entry,
+    spec_key,
+    touch_entry,
+)
+from .constants import (
+    MATERIAL_PARAMETERS,
+    NODE_REORDERING,
+    WRITE_MESH_FILES,
+)
+from .eigensolvers import choose_eigensolver, solve_eigenproblem, uses_initial_guess
+from .gmesher import generate_mesh, mesh_to_arrays
+from .instrumentation import event, files_bytes, stage
+from .mesh_transfer import interpolate_modes
+from .reordering import factorization_stats, reorder_mesh
+from .solution import Solution
+from .storage import atomic_save, key_lock, solutions_max_bytes
+from .symmetry import solve_symmetric, symmetric_eigenvalues
 from .utils import (
+    SOLUTION_ARRAYS,
+    check_solution_cached,
     check_solution_files_exists,
+    generate_mesh_array_filenames,
     generate_solution_filenames,
+    legacy_csv_filenames,
+    load_legacy_csv_eigvals,
+    load_legacy_csv_files,
+    load_mesh_arrays,
     load_solution_files,
+    save_mesh_arrays,
     save_solution_files,
 )
 
 
 def _load_mesh(mesh_file):
-    mesh = meshio.read(mesh_file)
+    import meshio  # only legacy caches keep .msh files to read
 
-    points = mesh.points
+    mesh = meshio.read(mesh_file)
     cells = mesh.cells
-    tri6 = cells["triangle6"]
-    line3 = cells["line3"]
-    npts = points.shape[0]
-    nels = tri6.shape[0]
+    return mesh_to_arrays(mesh.points, cells["triangle6"], cells["line3"])
+
 
-    nodes = np.zeros((npts, 3))
-    nodes[:, 1:] = points[:, 0:2]
+def _prepare_mesh(
+    geometry_type: str, params: dict, mesh_file: str, reuse_mesh: bool = True
+):
+    """
+    Returns cons, elements, nodes, assem_op and bc_array for the domain.
 
-    # Constraints
-    line_nodes = list(set(line3.flatten()))
-    cons = np.zeros((npts, 2), dtype=int)
-    cons[line_nodes, :] = -1
+    Nodes are renumbered with ``NODE_REORDERING`` before the DOF numbering.
+    The processed arrays are stored next to where the mesh file goes, so later
+    calls skip meshing and the DOF numbering. The ``.msh`` file itself is only
+    written with ``WRITE_MESH_FILES``. Concurrent calls for the same mesh wait
+    for the first one to store it.
+    """
+    mesh_array_files = generate_mesh_array_filenames(mesh_file)
+    if reuse_mesh and check_solution_files_exists(mesh_array_files):
+        return _load_mesh_arrays(mesh_array_files)
 
-    # Elements
-    elements = np.zeros((nels, 9), dtype=int)
-    elements[:, 1] = 2
-    elements[:, 3:] = tri6
+    mesh_key = os.path.splitext(os.path.basename(mesh_file))[0]
+    with key_lock(f"mesh-{mesh_key}"):
+        if reuse_mesh and check_solution_files_exists(mesh_array_files):
+            return _load_mesh_arrays(mesh_array_files)
+        return _generate_mesh_arrays(geometry_type, params, mesh_file)
 
-    return cons, elements, nodes
 
+def _load_mesh_arrays(mesh_array_files):
+    with stage("mesh_load") as record:
+        record["bytes_read"] = files_bytes(mesh_array_files.values())
+        return load_mesh_arrays(mesh_array_files)
+
+
+def _generate_mesh_arrays(geometry_type, params, mesh_file):
+    "Meshes the domain, numbers its DOFs and stores the processed arrays"
+    import solidspy.assemutil as ass  # imported on the first mesh, it is slow
+
+    mesh_array_files = generate_mesh_array_filenames(mesh_file)
+
+    with stage("mesh_generation"):
+        points, tri6, line3 = generate_mesh(
+            geometry_type, params, mesh_file=mesh_file if WRITE_MESH_FILES else None
+        )
+
+    with stage("dof_numbering") as record:
+        cons, elements, nodes = mesh_to_arrays(points, tri6, line3)
+        cons, elements, nodes = reorder_mesh(cons, elements, nodes, NODE_REORDERING)
+        assem_op, bc_array, neq = ass.DME(cons, elements, ndof_node=2, ndof_el_max=12)
+        record["neq"] = int(neq)
 
-def _compute_solution(geometry_type: str, params: dict, files_dict: dict):
+    with stage("mesh_save") as record:
+        save_mesh_arrays(cons, elements, nodes, assem_op, bc_array, mesh_array_files)
+        record["bytes_written"] = files_bytes(mesh_array_files.values())
+
+    return cons, elements, nodes, assem_op, bc_array
+
+
+def material_array(material: dict = None):
+    "Returns the solidspy ``mats`` array, MATERIAL_PARAMETERS by default"
+    material = material or MATERIAL_PARAMETERS
     mats = [
-        MATERIAL_PARAMETERS["E"],
-        MATERIAL_PARAMETERS["NU"],
-        MATERIAL_PARAMETERS["RHO"],
-    ]  # order imposed by elast_tri6
+        material["E"],
+        material["NU"],
+        material["RHO"],
+    ]  # order imposed by elast_tri6, kept by assemble_tri6
 
-    mats = np.array([mats])
+    return np.array([mats])
 
-    create_mesh(geometry_type, params, files_dict["mesh"])
 
-    cons, elements, nodes = _load_mesh(files_dict["mesh"])
-    # Assembly
-    assem_op, bc_array, neq = ass.DME(cons, elements, ndof_node=2, ndof_el_max=12)
-    stiff_mat, mass_mat = ass.assembler(
-        elements, mats, nodes, neq, assem_op, uel=elast_tri6
-    )
+def assemble_system(
+    geometry_type: str,
+    params: dict,
+    mesh_file: str,
+    reuse_mesh: bool = True,
+    material: dict = None,
+):
+    """
+    Returns the stiffness and mass matrices, bc_array, nodes and elements of
+    the domain, meshing it unless its mesh arrays are stored, see
+    ``_prepare_mesh``.
+    """
+    mats = material_array(material)
 
-    # Solution
-    eigvals, eigvecs = eigsh(
-        stiff_mat, M=mass_mat, k=stiff_mat.shape[0] - 1, which="SM"
+    _, elements, nodes, assem_op, bc_array = _prepare_mesh(
+        geometry_type, params, mesh_file, reuse_mesh=reuse_mesh
     )
+    neq = int(bc_array.max()) + 1  # equations are numbered 0..neq-1 by ass.DME
+    # Assembly
+    with stage("assembly", neq=neq) as record:
+        stiff_mat, mass_mat = assemble_tri6(elements, mats, nodes, neq, assem_op)
+        record["nnz"] = stiff_mat.nnz
+
+    return stiff_mat, mass_mat, bc_array, nodes, elements
+
+
+def _warm_start_guess(initial_solution, nodes, bc_array, n_modes=None, eigval_max=None):
+    """
+    Returns the eigenvectors of a related solution, the same domain on another
+    mesh or a uniform scaling of it, interpolated onto the given mesh. Only the
+    requested modes are interpolated.
+    """
+    with stage("warm_start_transfer") as record:
+        old_nodes = initial_solution.nodes.copy()
+        # geometries are built around the origin, so scalings are about it too
+        scale = np.abs(nodes[:, 1:3]).max() / np.abs(old_nodes[:, 1:3]).max()
+        old_nodes[:, 1:3] *= scale
+        if n_modes is None and eigval_max is not None:
+            # eigenvalues scale as the inverse square of the lengths
+            scaled_eigvals = initial_solution.eigvals / scale**2
+            n_modes = max(int(np.searchsorted(scaled_eigvals, eigval_max)), 1)
+        old_eigvecs = initial_solution.modes(slice(None, n_modes))
+        record["n_modes"] = old_eigvecs.shape[1]
+        return interpolate_modes(
+            old_nodes, initial_solution.bc_array, old_eigvecs, nodes, bc_array
+        )
+
 
-    save_solution_files(bc_array, eigvals, eigvecs, files_dict)
+def _compute_solution(
+    geometry_type: str,
+    params: dict,
+    files_dict: dict,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    reuse_mesh: bool = True,
+    material: dict = None,
+    initial_solution: Solution = None,
+    symmetry: bool = False,
+):
+    if symmetry:
+        if initial_solution is not None:
+            raise ValueError("Symmetry-reduced solves cannot be warm-started")
+        bc_array, eigvals, eigvecs, nodes, elements = solve_symmetric(
+            geometry_type,
+            params,
+            material_array(material),
+            n_modes=n_modes,
+            eigval_max=eigval_max,
+            solver=solver,
+        )
+    else:
+        stiff_mat, mass_mat, bc_array, nodes, elements = assemble_system(
+            geometry_type,
+            params,
+            files_dict["mesh"],
+            reuse_mesh=reuse_mesh,
+            material=material,
+        )
+
+        # Solution
+        if solver == "auto":
+            solver = choose_eigensolver(stiff_mat.shape[0], n_modes, eigval_max)
+        initial_guess = None
+        if initial_solution is not None and uses_initial_guess(
+            solver, n_modes, eigval_max
+        ):
+            initial_guess = _warm_start_guess(
+                initial_solution, nodes, bc_array, n_modes, eigval_max
+            )
+        eigvals, eigvecs = solve_eigenproblem(
+            stiff_mat,
+            mass_mat,
+            n_modes=n_modes,
+            eigval_max=eigval_max,
+            solver=solver,
+            initial_guess=initial_guess,
+        )
+
+    with stage("solution_save") as record:
+        save_solution_files(bc_array, eigvals, eigvecs, nodes, elements, files_dict)
+        record["bytes_written"] = files_bytes(
+            files_dict[array_name] for array_name in SOLUTION_ARRAYS
+        )
 
     return bc_array, eigvals, eigvecs, nodes, elements
 
 
-def retrieve_solution(geometry_type: str, params: dict, force_reprocess: bool = False):
+def compute_eigenvalues(
+    geometry_type: str,
+    params: dict,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    material: dict = None,
+    symmetry: bool = False,
+):
+    """
+    Returns the eigenvalues in the domain, without computing eigenvectors.
+
+    Nothing is cached but the mesh. With ``symmetry``, the fundamental sector
+    is solved instead, see ``symmetry.solve_symmetric``, and its mesh is not
+    cached either.
+    """
+    if symmetry:
+        return symmetric_eigenvalues(
+            geometry_type,
+            params,
+            material_array(material),
+            n_modes=n_modes,
+            eigval_max=eigval_max,
+            solver=solver,
+        )
     files_dict = generate_solution_filenames(geometry_type, params)
+    stiff_mat, mass_mat, _, _, _ = assemble_system(
+        geometry_type, params, files_dict["mesh"], material=material
+    )
+    eigvals, _ = solve_eigenproblem(
+        stiff_mat,
+        mass_mat,
+        n_modes=n_modes,
+        eigval_max=eigval_max,
+        solver=solver,
+        return_eigvecs=False,
+    )
+    return eigvals
 
-    if check_solution_files_exists(files_dict) and not force_reprocess:
-        bc_array, eigvals, eigvecs = load_solution_files(files_dict)
-        _, elements, nodes = _load_mesh(files_dict["mesh"])
 
-    else:
-        bc_array, eigvals, eigvecs, nodes, elements = _compute_solution(
-            geometry_type, params, files_dict
+def node_ordering_report(geometry_type: str, params: dict, methods=(None, "rcm")):
+    """
+    Returns the factorization statistics of K for each node reordering method,
+    None being gmsh's own numbering. See ``reordering.factorization_stats``.
+    """
+    import solidspy.assemutil as ass
+
+    points, tri6, line3 = generate_mesh(geometry_type, params)
+    mats = material_array()
+    report = {}
+    for method in methods:
+        cons, elements, nodes = reorder_mesh(
+            *mesh_to_arrays(points, tri6, line3), method
         )
+        assem_op, _, neq = ass.DME(cons, elements, ndof_node=2, ndof_el_max=12)
+        stiff_mat, _ = assemble_tri6(elements, mats, nodes, neq, assem_op)
+        report[method] = factorization_stats(stiff_mat)
+    return report
 
-    return bc_array, eigvals, eigvecs, nodes, elements
+
+class MaterialSweep:
+    """
+    Solves one domain for several materials, meshing and integrating it once.
+
+    K is linear in the plane stress Lame parameters and M in the density, so
+    each material only combines the stored K_lambda, K_mu and unit-density M,
+    which share a sparsity pattern. Each solve is warm-started from the
+    eigenvectors of the previous material.
+    """
+
+    def __init__(self, geometry_type: str, params: dict):
+        files_dict = generate_solution_filenames(geometry_type, params)
+        _, elements, nodes, assem_op, bc_array = _prepare_mesh(
+            geometry_type, params, files_dict["mesh"]
+        )
+        neq = int(bc_array.max()) + 1
+        self.bc_array, self.nodes, self.elements = bc_array, nodes, elements
+        self.stiff_lambda, self.stiff_mu, self.mass_unit = assemble_tri6_components(
+            elements, nodes, neq, assem_op
+        )
+        self.previous_eigvecs = None
+
+    def matrices(self, material: dict):
+        "Returns K and M for the material, reusing the stored sparsity pattern"
+        lame_lambda, lame_mu = lame_parameters(material["E"], material["NU"])
+        stiff_mat = self.stiff_lambda.copy()
+        stiff_mat.data = (
+            lame_lambda * self.stiff_lambda.data + lame_mu * self.stiff_mu.data
+        )
+        return stiff_mat, material["RHO"] * self.mass_unit
+
+    def solve(
+        self,
+        material: dict,
+        n_modes: int = None,
+        eigval_max: float = None,
+        solver: str = "auto",
+        warm_start: bool = True,
+    ):
+        "Returns the eigenvalues and eigenvectors of the domain for the material"
+        stiff_mat, mass_mat = self.matrices(material)
+        eigvals, eigvecs = solve_eigenproblem(
+            stiff_mat,
+            mass_mat,
+            n_modes=n_modes,
+            eigval_max=eigval_max,
+            solver=solver,
+            initial_guess=self.previous_eigvecs if warm_start else None,
+        )
+        self.previous_eigvecs = eigvecs
+        return eigvals, eigvecs
+
+
+def _migrate_legacy_csv_files(csv_files, files_dict):
+    "Loads a solution from the old CSV store and saves it in the .npy one"
+    with stage("legacy_load") as record:
+        bc_array, eigvals, eigvecs = load_legacy_csv_files(csv_files)
+        _, elements, nodes = _load_mesh(csv_files["mesh"])
+        record["bytes_read"] = files_bytes(csv_files.values())
+    with stage("solution_save") as record:
+        save_solution_files(bc_array, eigvals, eigvecs, nodes, elements, files_dict)
+        record["bytes_written"] = files_bytes(
+            files_dict[array_name] for array_name in SOLUTION_ARRAYS
+        )
+
+
+def _entry_filenames(entry_spec):
+    "Returns the solution filenames of an indexed spec"
+    return generate_solution_filenames(
+        entry_spec["geometry_type"],
+        entry_spec["params"],
+        material=entry_spec["material"],
+        symmetry=entry_spec["mesh"].get("symmetry", False),
+        **entry_spec["spectrum"],
+    )
+
+
+def _requested_modes(eigvals, spectrum):
+    "Returns the indices of the sorted eigenvalues a spectral request keeps"
+    n_modes, eigval_max = spectrum["n_modes"], spectrum["eigval_max"]
+    keep = np.arange(len(eigvals))[: None if n_modes is None else int(n_modes)]
+    if eigval_max is not None:
+        keep = keep[eigvals[keep] < eigval_max]
+    return keep
+
+
+def _scale_similar_solution(spec, files_dict):
+    """
+    Derives the solution from a cached one whose mesh is a uniform scaling of
+    the requested one, without solving. Returns False if there is none.
+    """
+    similar = find_similar_entry(spec)
+    if similar is None:
+        return False
+    _, similar_spec = similar
+    similar_files = _entry_filenames(similar_spec)
+    if not check_solution_cached(similar_files):
+        return False
+
+    with stage("similar_scaling") as record:
+        _scale_solution_files(spec, similar_spec, similar_files, files_dict)
+        record["bytes_read"] = files_bytes(
+            similar_files[array_name] for array_name in SOLUTION_ARRAYS
+        )
+    return True
+
+
+def _scale_solution_files(spec, similar_spec, similar_files, files_dict):
+    "Saves the solution of spec, scaled from the one of similar_spec"
+    bc_array, eigvals, eigvecs, nodes, elements = load_solution_files(similar_files)
+    scale = length_scale(spec) / length_scale(similar_spec)
+
+    # in 2D, K is invariant under a uniform scaling and M scales as scale**2,
+    # so eigenvalues go as 1 / scale**2 and M-normalized eigenvectors as 1 / scale
+    eigvals = eigvals / scale**2
+    keep = _requested_modes(eigvals, spec["spectrum"])
+    eigvecs = eigvecs[:, keep] / scale
+    nodes = nodes.copy()
+    nodes[:, 1:] *= scale
+
+    save_solution_files(bc_array, eigvals[keep], eigvecs, nodes, elements, files_dict)
+
+
+def retrieve_solution(
+    geometry_type: str,
+    params: dict,
+    force_reprocess: bool = False,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    use_similar: bool = True,
+    material: dict = None,
+    initial_solution: Solution = None,
+    symmetry: bool = False,
+):
+    """
+    Returns the (cached) solution of the eigenvalue problem in the domain.
+
+    By default the whole spectrum is computed. Pass ``n_modes`` to get only
+    the first modes, or ``eigval_max`` to get the modes with eigenvalues
+    below it; both can be combined. ``solver`` names one of the backends in
+    ``eigensolvers.EIGENSOLVERS``, or "auto" to pick one from the problem size.
+
+    The returned ``Solution`` holds the eigenvalues and mesh arrays, while the
+    eigenvectors are read from the memory-mapped store only when accessed.
+    Solutions are cached under a hash of the full problem spec, see ``cache``.
+    With ``use_similar``, a request whose mesh is a uniform scaling of a cached
+    one is derived from it instead of solved. ``material`` defaults to
+    ``MATERIAL_PARAMETERS``.
+
+    ``initial_solution``, a solution of the same domain on another mesh (or of
+    a uniform scaling of it), warm-starts the eigensolver when the solution has
+    to be computed: its eigenvectors are interpolated onto the new mesh.
+
+    With ``symmetry``, a square, triangle or circle is solved on its
+    fundamental sector once per parity about its symmetry axes, see
+    ``symmetry.solve_symmetric``, and the eigenvectors are given on the mesh
+    made of the reflected sector meshes. Such solutions are cached apart.
+    """
+    spec = problem_spec(
+        geometry_type, params, n_modes, eigval_max, solver, material, symmetry
+    )
+    solution_key = spec_key(spec)
+    files_dict = generate_solution_filenames(
+        geometry_type,
+        params,
+        n_modes=n_modes,
+        eigval_max=eigval_max,
+        solver=solver,
+        material=material,
+        symmetry=symmetry,
+    )
+    csv_files = legacy_csv_filenames(geometry_type, params)
+    # the old CSV store only held full spectra
+    full_spectrum = n_modes is None and eigval_max is None
+
+    produced = False
+    if force_reprocess or not check_solution_cached(files_dict):
+        # concurrent requests for the key wait here for the first producer
+        with key_lock(solution_key):
+            if force_reprocess or not check_solution_cached(files_dict):
+                start = time.perf_counter()
+                legacy = (
+                    material is None
+                    and not symmetry
+                    and full_spectrum
+                    and check_solution_files_exists(csv_files)
+                )
+                if not force_reprocess and legacy:
+                    event("cache", key=solution_key, result="legacy")
+                    _migrate_legacy_csv_files(csv_files, files_dict)
+                    compute_time = None  # unknown, it was computed before the index
+                elif (
+                    not force_reprocess
+                    and use_similar
+                    and _scale_similar_solution(spec, files_dict)
+                ):
+                    event("cache", key=solution_key, result="similar")
+                    compute_time = time.perf_counter() - start
+                else:
+                    event("cache", key=solution_key, result="miss")
+                    _compute_solution(
+                        geometry_type,
+                        params,
+                        files_dict,
+                        n_modes=n_modes,
+                        eigval_max=eigval_max,
+                        solver=solver,
+                        reuse_mesh=not force_reprocess,
+                        material=material,
+                        initial_solution=initial_solution,
+                        symmetry=symmetry,
+                    )
+                    compute_time = time.perf_counter() - start
+
+                solution_files = [
+                    files_dict[array_name] for array_name in SOLUTION_ARRAYS
+                ]
+                record_entry(solution_key, spec, solution_files, compute_time)
+                max_bytes = solutions_max_bytes()
+                if max_bytes is not None:
+                    evict_lru(max_bytes, keep=(solution_key,))
+                produced = True
+    if not produced:
+        event("cache", key=solution_key, result="hit")
+        touch_entry(solution_key)
+
+    with stage("solution_load") as record:
+        bc_array, eigvals, _, nodes, elements = load_solution_files(
+            files_dict, load_eigvecs=False
+        )
+        record["bytes_read"] = files_bytes(
+            files_dict[array_name]
+            for array_name in SOLUTION_ARRAYS
+            if array_name != "eigvecs"
+        )
+
+    return Solution(
+        bc_array, eigvals, nodes, elements, eigvecs_file=files_dict["eigvecs"]
+    )
+
+
+def _scale_similar_eigenvalues(spec):
+    """
+    Returns the eigenvalues derived from a cached spectrum, with or without
+    eigenvectors, of a uniform scaling of the domain, or None if there is none.
+    """
+    similar = find_similar_entry(spec, eigvecs=False)
+    if similar is None:
+        return None
+    _, similar_spec = similar
+    similar_eigvals_file = _entry_filenames(similar_spec)["eigvals"]
+    if not os.path.exists(similar_eigvals_file):
+        return None
+
+    with stage("similar_scaling") as record:
+        scale = length_scale(spec) / length_scale(similar_spec)
+        eigvals = np.load(similar_eigvals_file) / scale**2  # K fixed, M ~ scale**2
+        record["bytes_read"] = files_bytes([similar_eigvals_file])
+        return eigvals[_requested_modes(eigvals, spec["spectrum"])]
+
+
+def _load_cached_eigenvalues(solution_key, eigvals_file):
+    "Returns cached eigenvalues, recording the cache hit"
+    event("cache", key=solution_key, result="hit")
+    touch_entry(solution_key)
+    with stage("eigenvalues_load") as record:
+        record["bytes_read"] = files_bytes([eigvals_file])
+        return np.load(eigvals_file)
+
+
+def retrieve_eigenvalues(
+    geometry_type: str,
+    params: dict,
+    force_reprocess: bool = False,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    use_similar: bool = True,
+    material: dict = None,
+    symmetry: bool = False,
+):
+    """
+    Returns the (cached) eigenvalues of the problem in the domain, with the
+    arguments of ``retrieve_solution``.
+
+    Eigenvectors are neither computed nor read: a cached full solution of the
+    same problem is used if there is one, otherwise the eigenvalues are solved
+    for alone and cached in a small entry of their own, under the same key. A
+    later ``retrieve_solution`` of the problem computes the eigenvectors then.
+    """
+    spec = problem_spec(
+        geometry_type, params, n_modes, eigval_max, solver, material, symmetry
+    )
+    solution_key = spec_key(spec)
+    files_dict = generate_solution_filenames(
+        geometry_type,
+        params,
+        n_modes=n_modes,
+        eigval_max=eigval_max,
+        solver=solver,
+        material=material,
+        symmetry=symmetry,
+    )
+    eigvals_file = files_dict["eigvals"]
+
+    if not force_reprocess and os.path.exists(eigvals_file):
+        return _load_cached_eigenvalues(solution_key, eigvals_file)
+
+    # concurrent requests for the key wait here for the first producer
+    with key_lock(solution_key):
+        if not force_reprocess and os.path.exists(eigvals_file):
+            return _load_cached_eigenvalues(solution_key, eigvals_file)
+
+        start = time.perf_counter()
+        csv_files = legacy_csv_filenames(geometry_type, params)
+        eigvals = None
+        if (
+            not force_reprocess
+            and material is None
+            and not symmetry
+            and n_modes is None
+            and eigval_max is None  # the old CSV store only held full spectra
+            and os.path.exists(csv_files["eigvals"])
+        ):
+            event("cache", key=solution_key, result="legacy")
+            eigvals = load_legacy_csv_eigvals(csv_files)
+        elif not force_reprocess and use_similar:
+            eigvals = _scale_similar_eigenvalues(spec)
+            if eigvals is not None:
+                event("cache", key=solution_key, result="similar")
+        if eigvals is None:
+            event("cache", key=solution_key, result="miss")
+            eigvals = compute_eigenvalues(
+                geometry_type, params, n_modes, eigval_max, solver, material, symmetry
+            )
+        atomic_save(eigvals_file, eigvals)
+
+        # a full solution solved before keeps its eigenvectors in the index
+        full_solution = check_solution_cached(files_dict)
+        files = [files_dict[array_name] for array_name in SOLUTION_ARRAYS]
+        record_entry(
+            solution_key,
+            spec,
+            files if full_solution else [eigvals_file],
+            time.perf_counter() - start,
+            eigvecs=full_solution,
+        )
+        max_bytes = solutions_max_bytes()
+        if max_bytes is not None:
+            evict_lru(max_bytes, keep=(solution_key,))
+        return eigvals
@@ -1,23 +1,46 @@
 """
 Create meshes programmatically, using gmsh API for python
+
+gmsh is imported and a single session opened per process on the first mesh,
+and each mesh is built in a fresh model within it. The mesh is returned as
+arrays straight from gmsh, and written to a ``.msh`` file only when a file
+name is given.
 """
 
-import gmsh
+import atexit
+
+import numpy as np
+
+from .constants import MESH_ALGORITHM, MESH_ELEMENT_ORDER
+
+GMSH_LINE3 = 8  # gmsh element type of 3-node lines
+GMSH_TRIANGLE6 = 9  # gmsh element type of 6-node triangles
+
+_session = {"open": False}
+gmsh = None  # imported by ensure_session, it is slow and only needed to mesh
+
 
+def ensure_session():
+    "Imports gmsh and opens its session in this process, if not done yet"
+    global gmsh
+    if _session["open"]:
+        return
+    import gmsh
 
-def _create_square_mesh(side: float, mesh_size: float, mesh_file: str):
     gmsh.initialize()
     gmsh.option.setNumber("General.Verbosity", 0)  # no output in terminal
-    gmsh.model.add("square")
+    _session["open"] = True
+    atexit.register(close_session)
 
-    gmsh.option.setNumber("Mesh.Algorithm", 2)  # Delaunay, triangular mesh
-    gmsh.option.setNumber(
-        "Mesh.ElementOrder", 2
-    )  # Order of the elements, 2 means quadratic
 
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", mesh_size)
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", mesh_size)
+def close_session():
+    "Closes the gmsh session of this process"
+    if _session["open"]:
+        gmsh.finalize()
+        _session["open"] = False
+
 
+def _build_square(side: float, mesh_size: float):
     lc = mesh_size
     p1 = gmsh.model.geo.addPoint(0, 0, 0, lc)
     p2 = gmsh.model.geo.addPoint(side, 0, 0, lc)
@@ -31,30 +54,10 @@ def _create_square_mesh(side: float, mesh_size: float, mesh_file: str):
 
     cl = gmsh.model.geo.addCurveLoop([l1, l2, l3, l4])
     gmsh.model.geo.addPlaneSurface([cl])
+    return mesh_size
 
-    gmsh.model.geo.synchronize()
-    gmsh.model.mesh.generate(2)  # 2 means 2D mesh
-
-    gmsh.write(mesh_file)
-
-    # dev code, add breakpoint and check mesh
-    # gmsh.fltk.run()
-
-    gmsh.finalize()
-
-
-def _create_triangle_mesh(cathetus: float, mesh_size: float, mesh_file: str):
-    gmsh.initialize()
-    gmsh.option.setNumber("General.Verbosity", 0)
-
-    gmsh.model.add("triangle")
-
-    gmsh.option.setNumber("Mesh.Algorithm", 2)
-    gmsh.option.setNumber("Mesh.ElementOrder", 2)
-
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", mesh_size)
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", mesh_size)
 
+def _build_triangle(cathetus: float, mesh_size: float):
     lc = mesh_size
     p1 = gmsh.model.geo.addPoint(0, 0, 0, lc)
     p2 = gmsh.model.geo.addPoint(cathetus, 0, 0, lc)
@@ -66,26 +69,10 @@ def _create_triangle_mesh(cathetus: float, mesh_size: float, mesh_file: str):
 
     cl = gmsh.model.geo.addCurveLoop([l1, l2, l3])
     gmsh.model.geo.addPlaneSurface([cl])
-    gmsh.model.geo.synchronize()
-    gmsh.model.mesh.generate(2)
-    gmsh.write(mesh_file)
+    return mesh_size
 
-    # dev code, add breakpoint and check mesh
-    # gmsh.fltk.run()
-    gmsh.finalize()
-
-
-def _create_circle_mesh(radius: float, mesh_size: float, mesh_file: str):
-    gmsh.initialize()
-    gmsh.option.setNumber("General.Verbosity", 0)
-    gmsh.model.add("circle")
-
-    gmsh.option.setNumber("Mesh.Algorithm", 2)
-    gmsh.option.setNumber("Mesh.ElementOrder", 2)
-
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", mesh_size)
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", mesh_size)
 
+def _build_circle(radius: float, mesh_size: float):
     lc = mesh_size
     center = gmsh.model.geo.addPoint(0, 0, 0, lc)
     p1 = gmsh.model.geo.addPoint(radius, 0, 0, lc)
@@ -96,16 +83,12 @@ def _create_circle_mesh(radius: float, mesh_size: float, mesh_file: str):
 
     cl = gmsh.model.geo.addCurveLoop([circle1, circle2])
     gmsh.model.geo.addPlaneSurface([cl])
+    return mesh_size
 
-    gmsh.model.geo.synchronize()
-    gmsh.model.mesh.generate(2)
-    gmsh.write(mesh_file)
-    gmsh.finalize()
 
-
-def _create_isospectral_1_1(mesh_file: str):
+def _build_isospectral_1_1(mesh_size: float = 0.1):
     """
-    Create a mesh for the isospectral domain presented
+    Build the isospectral domain presented
     in https://en.wikipedia.org/wiki/Hearing_the_shape_of_a_drum#/media/File:Isospectral_drums.svg
     (the left one)
     """
@@ -119,13 +102,12 @@ def _create_isospectral_1_1(mesh_file: str):
         (1, 1),
         (2, 1),
     ]
-    mesh_size = 0.1
-    _create_mesh_from_coords(coords, mesh_size, mesh_file)
+    return _build_from_coords(coords, mesh_size)
 
 
-def _create_isospectral_1_2(mesh_file: str):
+def _build_isospectral_1_2(mesh_size: float = 0.1):
     """
-    Create a mesh for the isospectral domain presented
+    Build the isospectral domain presented
     in https://en.wikipedia.org/wiki/Hearing_the_shape_of_a_drum
     (the right one)
     """
@@ -140,13 +122,12 @@ def _create_isospectral_1_2(mesh_file: str):
         (0, 3),
         (0, 2),
     ]
-    mesh_size = 0.1
-    _create_mesh_from_coords(coords, mesh_size, mesh_file)
+    return _build_from_coords(coords, mesh_size)
 
 
-def _create_isospectral_2_1(mesh_file: str):
+def _build_isospectral_2_1(mesh_size: float = 0.1):
     """
-    Create a mesh for the isospectral domain presented
+    Build the isospectral domain presented
     in https://doi.org/10.1155/S1073792894000437
     (fig4. 7_3, left one)
     """
@@ -158,13 +139,12 @@ def _create_isospectral_2_1(mesh_file: str):
         (2, h),
         (0, h),
     ]
-    mesh_size = 0.1
-    _create_mesh_from_coords(coords, mesh_size, mesh_file)
+    return _build_from_coords(coords, mesh_size)
 
 
-def _create_isospectral_2_2(mesh_file: str):
+def _build_isospectral_2_2(mesh_size: float = 0.1):
     """
-    Create a mesh for the isospectral domain presented
+    Build the isospectral domain presented
     in https://doi.org/10.1155/S1073792894000437
     (fig4. 7_3, right one)
     """
@@ -176,22 +156,11 @@ def _create_isospectral_2_2(mesh_file: str):
         (0.5, 3 * h),
         (1, 2 * h),
     ]
-    mesh_size = 0.1
-    _create_mesh_from_coords(coords, mesh_size, mesh_file)
-
+    return _build_from_coords(coords, mesh_size)
 
-def _create_mesh_from_coords(coords, mesh_size, mesh_file):
-    """Create a mesh for a given set of coordinates"""
-    gmsh.initialize()
-    gmsh.option.setNumber("General.Verbosity", 0)
-    gmsh.model.add("custom")
-
-    gmsh.option.setNumber("Mesh.Algorithm", 2)
-    gmsh.option.setNumber("Mesh.ElementOrder", 2)
-
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", mesh_size)
-    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", mesh_size)
 
+def _build_from_coords(coords, mesh_size):
+    """Build the polygon with the given vertex coordinates"""
     lc = mesh_size
     ps = []
     for coord in coords:
@@ -203,25 +172,128 @@ def _create_mesh_from_coords(coords, mesh_size, mesh_file):
 
     cl = gmsh.model.geo.addCurveLoop(lines)
     gmsh.model.geo.addPlaneSurface([cl])
+    return mesh_size
+
+
+def _build_square_sector(side: float, mesh_size: float):
+    "Build the quarter of the square next to the origin"
+    return _build_from_coords(
+        [(0, 0), (side / 2, 0), (side / 2, side / 2), (0, side / 2)], mesh_size
+    )
+
+
+def _build_triangle_sector(cathetus: float, mesh_size: float):
+    "Build the half of the triangle below its symmetry axis, y = x"
+    return _build_from_coords(
+        [(0, 0), (cathetus, 0), (cathetus / 2, cathetus / 2)], mesh_size
+    )
+
+
+def _build_circle_sector(radius: float, mesh_size: float):
+    "Build the quarter of the circle in the first quadrant"
+    lc = mesh_size
+    center = gmsh.model.geo.addPoint(0, 0, 0, lc)
+    p1 = gmsh.model.geo.addPoint(radius, 0, 0, lc)
+    p2 = gmsh.model.geo.addPoint(0, radius, 0, lc)
+
+    l1 = gmsh.model.geo.addLine(center, p1)
+    arc = gmsh.model.geo.addCircleArc(p1, center, p2)
+    l2 = gmsh.model.geo.addLine(p2, center)
+
+    cl = gmsh.model.geo.addCurveLoop([l1, arc, l2])
+    gmsh.model.geo.addPlaneSurface([cl])
+    return mesh_size
+
+
+GEOMETRY_BUILDERS = {
+    "square": _build_square,
+    "triangle": _build_triangle,
+    "circle": _build_circle,
+    "isospectral_1_1": _build_isospectral_1_1,
+    "isospectral_1_2": _build_isospectral_1_2,
+    "isospectral_2_1": _build_isospectral_2_1,
+    "isospectral_2_2": _build_isospectral_2_2,
+}
+
+# fundamental sectors of the symmetric geometries, see symmetry.py
+SECTOR_BUILDERS = {
+    "square": _build_square_sector,
+    "triangle": _build_triangle_sector,
+    "circle": _build_circle_sector,
+}
+
+
+def _elements_of_type(element_type, tag_to_index):
+    "Returns the connectivity of every element of the type, as node indices"
+    _, node_tags = gmsh.model.mesh.getElementsByType(element_type)
+    n_nodes = gmsh.model.mesh.getElementProperties(element_type)[3]
+    return tag_to_index[node_tags.astype(int)].reshape(-1, n_nodes)
+
+
+def generate_mesh(geometry_type, params, mesh_file=None, sector=False):
+    """
+    Returns the points, 6-node triangles and 3-node boundary lines of the mesh.
+
+    Connectivities index the rows of ``points``. The mesh is also written to
+    ``mesh_file`` when one is given. With ``sector``, only the fundamental
+    sector of a symmetric geometry is meshed, see ``SECTOR_BUILDERS``.
+    """
+    builders = SECTOR_BUILDERS if sector else GEOMETRY_BUILDERS
+    if geometry_type not in builders:
+        raise ValueError(f"Unknown geometry type: {geometry_type}")
+
+    ensure_session()
+    gmsh.clear()
+    gmsh.model.add(geometry_type)
+    gmsh.option.setNumber("Mesh.Algorithm", MESH_ALGORITHM)
+    gmsh.option.setNumber("Mesh.ElementOrder", MESH_ELEMENT_ORDER)
+
+    mesh_size = builders[geometry_type](**params)
+    gmsh.option.setNumber("Mesh.CharacteristicLengthMin", mesh_size)
+    gmsh.option.setNumber("Mesh.CharacteristicLengthMax", mesh_size)
 
     gmsh.model.geo.synchronize()
-    gmsh.model.mesh.generate(2)
+    gmsh.model.mesh.generate(2)  # 2 means 2D mesh
+
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    node_tags = node_tags.astype(int)
+    points = coords.reshape(-1, 3)
+    tag_to_index = np.full(node_tags.max() + 1, -1, dtype=int)
+    tag_to_index[node_tags] = np.arange(len(node_tags))
+
+    tri6 = _elements_of_type(GMSH_TRIANGLE6, tag_to_index)
+    line3 = _elements_of_type(GMSH_LINE3, tag_to_index)
+
+    if mesh_file is not None:
+        gmsh.write(mesh_file)
 
-    gmsh.write(mesh_file)
-    gmsh.finalize()
+    # dev code, add breakpoint and check mesh
+    # gmsh.fltk.run()
+
+    return points, tri6, line3
+
+
+def mesh_to_arrays(points, tri6, line3):
+    "Returns cons, elements and nodes in solidspy format, nodes of line3 clamped"
+    npts = points.shape[0]
+    nels = tri6.shape[0]
+
+    nodes = np.zeros((npts, 3))
+    nodes[:, 1:] = points[:, 0:2]
+
+    # Constraints
+    line_nodes = np.unique(line3)
+    cons = np.zeros((npts, 2), dtype=int)
+    cons[line_nodes, :] = -1
+
+    # Elements
+    elements = np.zeros((nels, 9), dtype=int)
+    elements[:, 1] = 2
+    elements[:, 3:] = tri6
+
+    return cons, elements, nodes
 
 
 def create_mesh(geometry_type, params, mesh_file):
-    mesh_functions = {
-        "square": _create_square_mesh,
-        "triangle": _create_triangle_mesh,
-        "circle": _create_circle_mesh,
-        "isospectral_1_1": _create_isospectral_1_1,
-        "isospectral_1_2": _create_isospectral_1_2,
-        "isospectral_2_1": _create_isospectral_2_1,
-        "isospectral_2_2": _create_isospectral_2_2,
-    }
-    if geometry_type in mesh_functions:
-        mesh_functions[geometry_type](**params, mesh_file=mesh_file)
-    else:
-        raise ValueError(f"Unknown geometry type: {geometry_type}")
+    "Creates the mesh and writes it to mesh_file"
+    generate_mesh(geometry_type, params, mesh_file=mesh_file)
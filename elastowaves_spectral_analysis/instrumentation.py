@@ -0,0 +1,97 @@
+"""
+Opt-in records of where the time and memory of a solve go.
+
+The solver wraps each stage (mesh generation, DOF numbering, assembly,
+eigensolve, reads and writes of the store) in ``stage``, and reports cache
+lookups with ``event``. Nothing is measured unless a ``record_stages`` block is
+active, in which case every stage emits a dict with its name, wall time, peak
+traced allocation during the stage and whatever the stage adds (DOF count,
+nnz, bytes read or written, cache result):
+
+    with record_stages() as records:
+        retrieve_solution("square", {"side": 1.0, "mesh_size": 0.1})
+
+Stages do not nest, since the peak allocation is reset at each one.
+"""
+
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_recorders = []
+
+
+@contextmanager
+def record_stages(callback=None, trace_memory: bool = True):
+    """
+    Collects the records of the stages run within the block in the yielded
+    list, also passing each to ``callback`` if one is given. With
+    ``trace_memory``, allocations are traced with ``tracemalloc``, which slows
+    down allocation-heavy code.
+    """
+    records = []
+    recorder = (records, callback)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _recorders.append(recorder)
+    try:
+        yield records
+    finally:
+        _recorders.remove(recorder)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def _emit(record):
+    for records, callback in _recorders:
+        records.append(record)
+        if callback is not None:
+            callback(record)
+
+
+@contextmanager
+def stage(name: str, **info):
+    """
+    Measures the enclosed stage, if recording. Yields the record, to which the
+    stage can add its own fields.
+    """
+    if not _recorders:
+        yield {}
+        return
+
+    record = {"stage": name, **info}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["time"] = time.perf_counter() - start
+        if tracing:  # above what was allocated before the stage
+            peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+            record["peak_memory"] = peak_memory
+        _emit(record)
+
+
+def event(name: str, **info):
+    "Records an instant event, such as a cache hit, if recording"
+    if _recorders:
+        _emit({"stage": name, **info})
+
+
+def stage_totals(records) -> dict:
+    "Returns the total time spent in each stage, slowest first"
+    totals = {}
+    for record in records:
+        if "time" in record:
+            totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["time"]
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def files_bytes(files) -> int:
+    "Returns the total size of the given files"
+    return sum(os.path.getsize(this_file) for this_file in files)
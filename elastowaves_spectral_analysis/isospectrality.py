@@ -0,0 +1,315 @@
+"""
+Isospectrality checks of pairs of domains, stopping at the first mode pair
+that differs.
+
+Both spectra are computed band by band over growing eigenvalue intervals with
+the spectrum slicing pieces of ``eigensolvers``: the inertia of K - sigma M
+counts the modes below each band edge, and a shift-invert solve at the band
+center finds them. After each band, the eigenvalues known in both domains are
+compared, so a pair that is not isospectral costs only the bands up to its
+first differing mode. Two eigenvalues differ when their relative difference
+exceeds the tolerance, by default a multiple of the larger estimated
+discretization error of the two meshes, which grows with the eigenvalue.
+Conforming finite elements overestimate every eigenvalue, so the errors of the
+two spectra partly cancel in their difference.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from scipy.sparse.linalg import eigsh
+
+from .adaptive import DEFAULT_MESH_SIZE
+from .cache import problem_spec, record_entry, spec_key
+from .constants import MESH_ELEMENT_ORDER
+from .eigensolvers import solve_slice, take_slice_modes
+from .fem_solver import assemble_system, retrieve_eigenvalues
+from .storage import atomic_save
+from .utils import generate_solution_filenames
+
+BAND_SIZE = 50  # modes per band, roughly
+SOLVER_RTOL = 1e-8  # below this, differences are solver noise
+ERROR_SAFETY_FACTOR = 2.0  # margin on the discretization error estimate
+ERROR_CHECK_MODES = 20  # modes the discretization error is estimated from
+ERROR_REFINEMENT = 1.5  # ratio of the coarse to the given mesh size
+
+_error_models = {}  # fitted error model of each spectrum, in this process
+
+
+def _cached_eigenvalues(geometry_type, params, n_modes):
+    "Returns cached eigenvalues covering the first n_modes, or None"
+    for spectrum in (
+        {"n_modes": n_modes, "solver": "slicing"},
+        {"n_modes": n_modes},
+        {},  # the whole spectrum
+    ):
+        eigvals_file = generate_solution_filenames(geometry_type, params, **spectrum)[
+            "eigvals"
+        ]
+        if os.path.exists(eigvals_file):
+            eigvals = np.load(eigvals_file)
+            if len(eigvals) >= n_modes:
+                return eigvals
+    return None
+
+
+def _first_eigenvalues(geometry_type, params, n_modes):
+    "Returns the first n_modes eigenvalues, from the store or solved and cached"
+    eigvals = _cached_eigenvalues(geometry_type, params, n_modes)
+    if eigvals is None:
+        eigvals = retrieve_eigenvalues(geometry_type, params, n_modes=n_modes)
+    return eigvals[:n_modes]
+
+
+class BandedSpectrum:
+    """
+    Eigenvalues of a domain, known up to ``upper`` and computed band by band.
+
+    Cached eigenvalues are used when there are enough of them. Otherwise the
+    system is assembled on the first band.
+    """
+
+    def __init__(self, geometry_type: str, params: dict, n_modes: int = None):
+        self.geometry_type, self.params = geometry_type, params
+        self.eigvals = np.empty(0)
+        self.upper = 0.0
+        self._matrices = None
+        cached = (
+            None
+            if n_modes is None
+            else _cached_eigenvalues(geometry_type, params, n_modes)
+        )
+        if cached is not None:
+            self.eigvals = cached[:n_modes]
+            self.upper = np.nextafter(self.eigvals[-1], np.inf)
+
+    @property
+    def count(self):
+        return len(self.eigvals)
+
+    @property
+    def matrices(self):
+        "Stiffness and mass matrices, assembled on first use"
+        if self._matrices is None:
+            mesh_file = generate_solution_filenames(self.geometry_type, self.params)[
+                "mesh"
+            ]
+            stiff_mat, mass_mat, _, _, _ = assemble_system(
+                self.geometry_type, self.params, mesh_file
+            )
+            self._matrices = stiff_mat, mass_mat
+        return self._matrices
+
+    @property
+    def neq(self):
+        "Number of equations, the most modes the spectrum can have"
+        return self.matrices[0].shape[0]
+
+    def next_upper(self, band_size: int = BAND_SIZE):
+        "Guesses the band edge above which about band_size more modes lie"
+        if self.count == 0:  # Weyl's law guess, as in spectrum_slicing
+            stiff_mat, mass_mat = self.matrices
+            lowest = eigsh(stiff_mat, M=mass_mat, k=1, sigma=0.0, which="LM")[0][0]
+            return band_size * lowest
+        return self.upper * (1 + band_size / self.count)
+
+    def slice_args(self, upper, band_size: int = BAND_SIZE):
+        "Returns the eigensolvers.solve_slice arguments of the band up to upper"
+        stiff_mat, mass_mat = self.matrices
+        k_guess = int(np.ceil(1.2 * band_size)) + 1
+        return stiff_mat, mass_mat, self.upper, upper, k_guess, False
+
+    def add_band(self, upper, slice_result):
+        "Adds the modes found by solve_slice below upper"
+        count_upper, eigvals, _, _ = slice_result
+        eigvals, _ = take_slice_modes(
+            eigvals, None, self.upper, upper, count_upper - self.count
+        )
+        self.eigvals = np.concatenate([self.eigvals, eigvals])
+        self.upper = upper
+
+    def relative_error(self, eigvals):
+        """
+        Returns the estimated relative discretization error at the eigenvalues.
+
+        The first modes are also solved on a mesh coarser by ERROR_REFINEMENT,
+        which gives their error on the given mesh from the nominal convergence
+        rate h^(2p), for elements of order p. The errors are then fitted as
+        C * lambda^q, q being at most p since they go as (h^2 lambda)^p in the
+        asymptotic range, and grow more slowly before it.
+
+        Both solves go through the store, so each is made once, and the fitted
+        model is kept for the rest of the process.
+        """
+        key = spec_key(problem_spec(self.geometry_type, self.params))
+        if key not in _error_models:
+            order = MESH_ELEMENT_ORDER
+            mesh_size = self.params.get("mesh_size", DEFAULT_MESH_SIZE)
+            coarse_params = {**self.params, "mesh_size": mesh_size * ERROR_REFINEMENT}
+            if self.count >= ERROR_CHECK_MODES:
+                fine = self.eigvals[:ERROR_CHECK_MODES]
+            else:
+                fine = _first_eigenvalues(
+                    self.geometry_type, self.params, ERROR_CHECK_MODES
+                )
+            coarse = _first_eigenvalues(
+                self.geometry_type, coarse_params, ERROR_CHECK_MODES
+            )
+            error = np.abs(coarse - fine) / (ERROR_REFINEMENT ** (2 * order) - 1)
+            error = np.maximum(error / fine, SOLVER_RTOL)
+            exponent, log_coefficient = np.polyfit(np.log(fine), np.log(error), 1)
+            _error_models[key] = np.exp(log_coefficient), np.clip(exponent, 1, order)
+        coefficient, exponent = _error_models[key]
+        return coefficient * eigvals**exponent
+
+    def save(self, n_modes: int):
+        "Caches the first n_modes as an eigenvalue-only entry, see retrieve_eigenvalues"
+        spec = problem_spec(
+            self.geometry_type, self.params, n_modes=n_modes, solver="slicing"
+        )
+        files_dict = generate_solution_filenames(
+            self.geometry_type, self.params, n_modes=n_modes, solver="slicing"
+        )
+        if os.path.exists(files_dict["eigvals"]):
+            return
+        atomic_save(files_dict["eigvals"], self.eigvals[:n_modes])
+        record_entry(spec_key(spec), spec, [files_dict["eigvals"]], None, eigvecs=False)
+
+
+def _extend_to(spectra, upper, band_size, pool=None):
+    "Computes the modes of each spectrum up to upper, in parallel with a pool"
+    lagging = [spectrum for spectrum in spectra if spectrum.upper < upper]
+    args = [spectrum.slice_args(upper, band_size) for spectrum in lagging]
+    if pool is None or len(lagging) < 2:
+        results = [solve_slice(*slice_args) for slice_args in args]
+    else:
+        results = list(pool.map(solve_slice, *zip(*args)))
+    for spectrum, result in zip(lagging, results):
+        spectrum.add_band(upper, result)
+
+
+def _tolerances(spectrum_a, spectrum_b, eigvals, tol):
+    "Returns the relative tolerance of each eigenvalue"
+    if tol is not None:
+        return np.full(len(eigvals), float(tol))
+    error = np.maximum(
+        spectrum_a.relative_error(eigvals), spectrum_b.relative_error(eigvals)
+    )
+    return ERROR_SAFETY_FACTOR * error + SOLVER_RTOL
+
+
+def _compare_banded(spectrum_a, spectrum_b, n_modes, tol, band_size, pool):
+    "Compares two banded spectra up to the first differing mode"
+    for spectrum in (spectrum_a, spectrum_b):
+        if spectrum.count < n_modes and spectrum.neq < n_modes:
+            raise ValueError(
+                f"Cannot compare {n_modes} modes, the {spectrum.geometry_type} "
+                f"mesh has only {spectrum.neq} equations"
+            )
+    n_compared = 0
+    rel_diffs, tols = [], []
+    while True:
+        n_known = min(spectrum_a.count, spectrum_b.count, n_modes)
+        eigvals_a = spectrum_a.eigvals[n_compared:n_known]
+        eigvals_b = spectrum_b.eigvals[n_compared:n_known]
+        rel_diff = np.abs(eigvals_a - eigvals_b) / (0.5 * (eigvals_a + eigvals_b))
+        band_tols = _tolerances(spectrum_a, spectrum_b, eigvals_a, tol)
+        rel_diffs.append(rel_diff)
+        tols.append(band_tols)
+        differing = np.flatnonzero(rel_diff > band_tols)
+        if len(differing):
+            first_difference = n_compared + int(differing[0])
+            n_compared = first_difference + 1
+            break
+        n_compared = n_known
+        if n_compared >= n_modes:
+            first_difference = None
+            break
+        lagging = min(spectrum_a, spectrum_b, key=lambda spectrum: spectrum.upper)
+        _extend_to(
+            [spectrum_a, spectrum_b], lagging.next_upper(band_size), band_size, pool
+        )
+
+    return {
+        "isospectral": first_difference is None,
+        "first_difference": first_difference,
+        "n_compared": n_compared,
+        "eigvals_a": spectrum_a.eigvals[:n_compared],
+        "eigvals_b": spectrum_b.eigvals[:n_compared],
+        "rel_diff": np.concatenate(rel_diffs)[:n_compared],
+        "tol": np.concatenate(tols)[:n_compared],
+    }
+
+
+def _spectrum_id(geometry):
+    geometry_type, params = geometry
+    return spec_key(problem_spec(geometry_type, params))
+
+
+def compare_many(
+    pairs, n_modes: int, tol: float = None, band_size: int = BAND_SIZE, workers=2
+):
+    """
+    Compares each pair of ``(geometry_type, params)`` domains up to their first
+    ``n_modes``, see ``compare_spectra``, and returns the results in order.
+
+    Each domain is meshed, assembled and solved once, however many pairs it
+    belongs to, and cached spectra are used when they hold enough modes.
+    Spectra found to be complete are cached as eigenvalue-only entries. Each
+    band of the two domains of a pair is solved in parallel with ``workers``
+    processes.
+    """
+    spectra = {}
+    for pair in pairs:
+        for geometry in pair:
+            spectrum_id = _spectrum_id(geometry)
+            if spectrum_id not in spectra:
+                spectra[spectrum_id] = BandedSpectrum(*geometry, n_modes=n_modes)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+    try:
+        results = []
+        for geometry_a, geometry_b in pairs:
+            spectrum_a = spectra[_spectrum_id(geometry_a)]
+            spectrum_b = spectra[_spectrum_id(geometry_b)]
+            results.append(
+                _compare_banded(spectrum_a, spectrum_b, n_modes, tol, band_size, pool)
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for spectrum in spectra.values():
+        if spectrum.count >= n_modes:
+            spectrum.save(n_modes)
+    return results
+
+
+def compare_spectra(
+    geometry_a,
+    geometry_b,
+    n_modes: int,
+    tol: float = None,
+    band_size: int = BAND_SIZE,
+    workers=2,
+):
+    """
+    Checks if the first ``n_modes`` eigenvalues of two ``(geometry_type,
+    params)`` domains agree, to a relative tolerance ``tol``.
+
+    Without ``tol``, each mode gets a multiple of the discretization error
+    estimated for the meshes at its eigenvalue, see
+    ``BandedSpectrum.relative_error``. The estimate needs the first
+    ``ERROR_CHECK_MODES`` modes of each domain on a mesh ``ERROR_REFINEMENT``
+    times coarser too, one more solve per domain the first time it is
+    compared, then cached; pass ``tol`` to skip it.
+    The spectra are solved band by band and the comparison stops at the first
+    mode pair that differs. Returns a dict with ``isospectral``, the index of
+    the ``first_difference`` (None if there is none), ``n_compared`` and the
+    compared eigenvalues, relative differences and tolerances.
+    """
+    return compare_many([(geometry_a, geometry_b)], n_modes, tol, band_size, workers)[0]
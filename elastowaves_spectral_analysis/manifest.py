@@ -0,0 +1,126 @@
+"""
+Resumable sweeps, recorded in a compact results table as each run finishes.
+
+The manifest is a JSON lines file with one row per solved spec: its cache key,
+the spec, the spectral summary Weyl-law fits need (eigenvalue count, largest
+eigenvalue and N(R_max) / R_max), the wall time of the run and the peak RSS of
+the process that made it, plus the records of its stages when they are traced.
+The peak RSS is a high-water mark over the lifetime of that process, which may
+have made larger runs before; traced stages give the peak memory of each run.
+Rows are appended and flushed one at a time, so a killed sweep keeps every
+finished run and a restarted one skips them.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .cache import spec_key
+from .sweeps import sweep_problem_spec, solve_many
+
+SPEC_FIELDS = (
+    "geometry_type",
+    "params",
+    "n_modes",
+    "eigval_max",
+    "solver",
+    "material",
+    "symmetry",
+)
+
+
+def manifest_row(key, spec, eigvals, stats) -> dict:
+    "Returns the manifest row of a solved spec"
+    n_eigvals = len(eigvals)
+    R_max = float(np.max(eigvals)) if n_eigvals else None
+    row = {
+        "key": key,
+        "spec": {field: spec[field] for field in SPEC_FIELDS if field in spec},
+        "n_eigvals": n_eigvals,
+        "R_max": R_max,
+        "N_R_max": n_eigvals / R_max if n_eigvals else None,
+        "time": stats["time"],
+        "process_peak_rss": stats["process_peak_rss"],
+    }
+    if "stages" in stats:
+        row["stages"] = stats["stages"]
+    return row
+
+
+def read_manifest(manifest_file) -> dict:
+    """
+    Returns the rows of a manifest by key, empty if it does not exist yet. A
+    last line left incomplete by a killed sweep is ignored.
+    """
+    rows = {}
+    if not os.path.exists(manifest_file):
+        return rows
+    with open(manifest_file) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows[row["key"]] = row
+    return rows
+
+
+def _ends_with_newline(manifest_file):
+    "Checks if the manifest is empty or its last line is complete"
+    if not os.path.exists(manifest_file) or os.path.getsize(manifest_file) == 0:
+        return True
+    with open(manifest_file, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _append_row(f, row):
+    f.write(json.dumps(row, sort_keys=True) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def run_sweep(
+    specs,
+    manifest_file,
+    workers: int = None,
+    blas_threads: int = 1,
+    trace_stages: bool = False,
+):
+    """
+    Solves the specs not in the manifest yet, appending a row for each as it
+    finishes, and returns the manifest rows of all specs, in their order.
+
+    Specs are given as to ``sweeps.solve_many``. With ``trace_stages``, rows
+    also hold the time, peak allocation and sizes of each stage of the run.
+    """
+    keys = [spec_key(sweep_problem_spec(spec)) for spec in specs]
+    rows = read_manifest(manifest_file)
+    pending = {}
+    for spec, key in zip(specs, keys):
+        if key not in rows:
+            pending.setdefault(key, spec)
+
+    if pending:
+        manifest_dir = os.path.dirname(manifest_file)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        pending_keys, pending_specs = list(pending), list(pending.values())
+        complete = _ends_with_newline(manifest_file)
+        with open(manifest_file, "a") as f:
+            if not complete:  # close the line a killed sweep left incomplete
+                f.write("\n")
+            for i, eigvals, stats in solve_many(
+                pending_specs,
+                workers,
+                blas_threads,
+                return_stats=True,
+                trace_stages=trace_stages,
+                eigvals_only=True,
+            ):
+                key, spec = pending_keys[i], pending_specs[i]
+                rows[key] = manifest_row(key, spec, eigvals, stats)
+                _append_row(f, rows[key])
+
+    return [rows[key] for key in keys]
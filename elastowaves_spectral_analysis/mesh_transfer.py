@@ -0,0 +1,49 @@
+"""
+Transfer of eigenvectors between the DOF numbering and the nodes of a mesh,
+and between meshes of the same domain.
+"""
+
+import numpy as np
+
+
+def nodal_modes(bc_array, eigvecs):
+    """
+    Returns the nodal displacements (n_nodes, 2, n_modes) of eigenvectors given
+    as columns over the equations, zero at constrained DOFs.
+    """
+    eigvecs = np.asarray(eigvecs)
+    if eigvecs.ndim == 1:
+        eigvecs = eigvecs[:, None]
+    free = bc_array != -1
+    nodal = np.zeros((*bc_array.shape, eigvecs.shape[1]))
+    nodal[free] = eigvecs[bc_array[free]]
+    return nodal
+
+
+def reduced_modes(bc_array, nodal, neq=None):
+    "Returns the eigenvectors over the equations of nodal displacements"
+    free = bc_array != -1
+    neq = int(bc_array.max()) + 1 if neq is None else neq
+    eigvecs = np.zeros((neq, nodal.shape[-1]))
+    eigvecs[bc_array[free]] = nodal[free]
+    return eigvecs
+
+
+def interpolate_modes(nodes, bc_array, eigvecs, new_nodes, new_bc_array):
+    """
+    Returns eigenvectors of one mesh linearly interpolated onto the nodes of
+    another mesh of the same domain, over the equations of the new mesh.
+
+    New nodes outside the old mesh, near curved boundaries, get a zero
+    displacement, as the boundary is clamped.
+    """
+    # scipy.interpolate is slow to import and only needed for warm starts
+    from scipy.interpolate import LinearNDInterpolator
+
+    nodal = nodal_modes(bc_array, eigvecs)
+    n_modes = nodal.shape[-1]
+    interpolator = LinearNDInterpolator(
+        nodes[:, 1:3], nodal.reshape(len(nodes), -1), fill_value=0.0
+    )
+    new_nodal = interpolator(new_nodes[:, 1:3]).reshape(len(new_nodes), 2, n_modes)
+    return reduced_modes(new_bc_array, new_nodal)
@@ -0,0 +1,134 @@
+"""
+Batched post-processing of eigenmodes and rendering of mode atlases.
+
+The requested modes are expanded to nodal displacements in a single indexing
+operation, and the triangulation of a mesh is built once and shared by all of
+its plots. An atlas is a series of images, each a grid of modes, rendered in
+parallel by worker processes drawing on Agg canvases, without pyplot or an
+interactive backend.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from .instrumentation import stage
+from .mesh_transfer import nodal_modes
+from .storage import make_parent_folders
+
+# linear triangles of a 6-node triangle, as in solidspy.postprocesor.mesh2tri
+TRI6_SUBTRIANGLES = [[3, 6, 8], [6, 7, 8], [6, 4, 7], [7, 5, 8]]
+
+ATLAS_GRID = (5, 5)  # rows and columns of modes in each atlas image
+ATLAS_DPI = 150
+CONTOUR_LEVELS = 12
+
+_renderer = {}  # triangulation of the mesh being rendered, in this process
+
+
+def triangulation_arrays(nodes, elements):
+    "Returns the x and y node coordinates and the linear triangles of the mesh"
+    triangles = elements[:, TRI6_SUBTRIANGLES].reshape(-1, 3)
+    return nodes[:, 1], nodes[:, 2], triangles
+
+
+def mesh_triangulation(nodes, elements):
+    "Returns the matplotlib Triangulation of the mesh"
+    from matplotlib.tri import Triangulation
+
+    return Triangulation(*triangulation_arrays(nodes, elements))
+
+
+def mode_fields(bc_array, eigvecs):
+    """
+    Returns the x and y displacements and the displacement amplitudes
+    (n_nodes, n_modes) of eigenvectors given as columns over the equations.
+    """
+    nodal = nodal_modes(bc_array, eigvecs)
+    return nodal[:, 0], nodal[:, 1], np.hypot(nodal[:, 0], nodal[:, 1])
+
+
+def _init_renderer(x, y, triangles):
+    "Builds the triangulation that the grids rendered in this process share"
+    from matplotlib.tri import Triangulation
+
+    _renderer["triangulation"] = Triangulation(x, y, triangles)
+
+
+def _render_grid(image_file, fields, eigvals, grid, dpi):
+    "Renders the fields (n_nodes, n_modes) in a grid of contour plots"
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    triangulation = _renderer["triangulation"]
+    n_rows, n_cols = grid
+    fig = Figure(figsize=(1.6 * n_cols, 1.6 * n_rows))
+    FigureCanvasAgg(fig)
+    axs = fig.subplots(n_rows, n_cols, squeeze=False).ravel()
+    for ax in axs:
+        ax.axis("off")
+    for ax, field, eigval in zip(axs, fields.T, eigvals):
+        ax.tricontourf(triangulation, field, levels=CONTOUR_LEVELS)
+        ax.set_aspect("equal")
+        ax.set_title(
+            rf"$\lambda$ = {round(eigval, 1)}",
+            loc="left",
+            fontsize=8,
+            pad=1,
+            color="black",
+        )
+    fig.savefig(image_file, dpi=dpi)
+    return image_file
+
+
+def render_atlas(
+    solution,
+    image_prefix: str,
+    modes=None,
+    grid=ATLAS_GRID,
+    dpi: int = ATLAS_DPI,
+    workers: int = None,
+):
+    """
+    Plots the displacement amplitude of the given modes of a solution, all of
+    them by default, in grids of ``grid`` modes. Returns the image files,
+    ``{image_prefix}.png``, or numbered from ``{image_prefix}_000.png`` when
+    the modes take several grids.
+
+    The grids are rendered by ``workers`` processes, one per CPU by default.
+    """
+    modes = np.arange(solution.n_modes)[slice(None) if modes is None else modes]
+    with stage("mode_expansion", modes=len(modes)):
+        *_, amplitudes = mode_fields(solution.bc_array, solution.modes(modes))
+    eigvals = solution.eigvals[modes]
+
+    per_grid = grid[0] * grid[1]
+    starts = range(0, len(modes), per_grid)
+    if len(starts) == 1:
+        image_files = [f"{image_prefix}.png"]
+    else:
+        image_files = [f"{image_prefix}_{i:03d}.png" for i in range(len(starts))]
+    make_parent_folders(image_files)
+    args = (
+        image_files,
+        [amplitudes[:, start : start + per_grid] for start in starts],
+        [eigvals[start : start + per_grid] for start in starts],
+        [grid] * len(starts),
+        [dpi] * len(starts),
+    )
+
+    mesh = triangulation_arrays(solution.nodes, solution.elements)
+    workers = min(workers or os.cpu_count(), len(image_files))
+    with stage("atlas_rendering", images=len(image_files), workers=workers):
+        if workers > 1:
+            with ProcessPoolExecutor(
+                workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_renderer,
+                initargs=mesh,
+            ) as pool:
+                return list(pool.map(_render_grid, *args))
+        _init_renderer(*mesh)
+        return list(map(_render_grid, *args))
@@ -0,0 +1,52 @@
+"""
+Lazy access to a solution of the eigenvalue problem.
+"""
+
+import numpy as np
+
+
+class Solution:
+    """
+    Solution of the eigenvalue problem in a domain.
+
+    Eigenvalues, mesh arrays and ``bc_array`` are held in memory, while the
+    eigenvectors stay in the on-disk store until a mode is requested. They are
+    stored column-major, so reading a few modes only touches those columns.
+
+    Unpacks as ``bc_array, eigvals, eigvecs, nodes, elements``, like the tuple
+    ``retrieve_solution`` used to return.
+    """
+
+    def __init__(
+        self, bc_array, eigvals, nodes, elements, eigvecs=None, eigvecs_file=None
+    ):
+        self.bc_array = bc_array
+        self.eigvals = eigvals
+        self.nodes = nodes
+        self.elements = elements
+        self._eigvecs = eigvecs
+        self._eigvecs_file = eigvecs_file
+
+    @property
+    def eigvecs(self):
+        "Eigenvectors as columns, memory-mapped when they come from the store"
+        if self._eigvecs is None:
+            self._eigvecs = np.load(self._eigvecs_file, mmap_mode="r")
+        return self._eigvecs
+
+    @property
+    def n_modes(self):
+        return len(self.eigvals)
+
+    def eigvec(self, mode: int):
+        "Returns the eigenvector of the given mode, read into memory"
+        return np.array(self.eigvecs[:, mode])
+
+    def modes(self, modes):
+        "Returns the eigenvectors of a slice or list of modes, read into memory"
+        return np.array(self.eigvecs[:, modes])
+
+    def __iter__(self):
+        return iter(
+            (self.bc_array, self.eigvals, self.eigvecs, self.nodes, self.elements)
+        )
@@ -0,0 +1,74 @@
+"""
+Spectral statistics: counting function N(R) and Weyl-law fits, batched over
+many spectra.
+"""
+
+import numpy as np
+
+
+class CountingFunction:
+    """
+    Counting function N(R), the number of eigenvalues below R, of one or many
+    spectra.
+
+    Spectra are sorted once, so each evaluation is a binary search per R.
+    """
+
+    def __init__(self, eigvalss):
+        if np.ndim(eigvalss[0]) == 0:  # a single spectrum
+            eigvalss = [eigvalss]
+        self.spectra = [np.sort(np.asarray(eigvals)) for eigvals in eigvalss]
+
+    def __len__(self):
+        return len(self.spectra)
+
+    def __call__(self, Rs):
+        "Returns N(R) for every spectrum (rows) and every R in Rs (columns)"
+        Rs = np.asarray(Rs)
+        return np.stack(
+            [np.searchsorted(spectrum, Rs, side="left") for spectrum in self.spectra]
+        )
+
+    @property
+    def R_max(self):
+        "Largest eigenvalue of each spectrum"
+        return np.array([spectrum[-1] for spectrum in self.spectra])
+
+    @property
+    def N_R_max(self):
+        "N(R_max) / R_max of each spectrum, the quantity Weyl's law relates to area"
+        return np.array([len(spectrum) for spectrum in self.spectra]) / self.R_max
+
+
+def slope_through_origin(x, y):
+    "Least-squares slope of y = slope * x, batched over the leading axes"
+    x, y = np.asarray(x), np.asarray(y)
+    return np.sum(x * y, axis=-1) / np.sum(x**2, axis=-1)
+
+
+def rsquared_through_origin(x, y):
+    "R^2 of the fit y = slope * x, batched over the leading axes"
+    x, y = np.asarray(x), np.asarray(y)
+    r = np.sum(x * y, axis=-1) / np.sqrt(np.sum(x**2, axis=-1) * np.sum(y**2, axis=-1))
+    return r**2
+
+
+def linear_regression(x, y):
+    """
+    Least-squares fit of y = slope * x + intercept, batched over the leading
+    axes. Returns slope, intercept, r and the standard error of the slope, as
+    ``scipy.stats.linregress`` does.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = x.shape[-1]
+    x_mean = x.mean(axis=-1, keepdims=True)
+    y_mean = y.mean(axis=-1, keepdims=True)
+    ssxm = np.sum((x - x_mean) ** 2, axis=-1)
+    ssym = np.sum((y - y_mean) ** 2, axis=-1)
+    ssxym = np.sum((x - x_mean) * (y - y_mean), axis=-1)
+
+    slope = ssxym / ssxm
+    intercept = y_mean[..., 0] - slope * x_mean[..., 0]
+    r = np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0)
+    std_err = np.sqrt((1 - r**2) * ssym / ssxm / (n - 2))
+    return slope, intercept, r, std_err
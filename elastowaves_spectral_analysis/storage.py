@@ -0,0 +1,168 @@
+"""
+Location of the mesh and solution store, and safe concurrent writes to it.
+
+The store lives under ``DATA_ROOT`` in the working directory, or under the
+folder named by the ``DATA_ROOT_ENV`` environment variable, which
+``set_data_root`` sets so that spawned workers inherit it. Figures, sweep
+manifests and benchmark results are kept under the same root. Many processes
+can share one store:
+
+- files are written under a temporary name and renamed in place, so a reader
+  never sees a partial file,
+- producing a cache entry takes a lock on its key, so concurrent requests for
+  the same key wait for the first producer instead of computing it again.
+
+Locks are ``flock`` locks on files in the ``locks`` folder of the store. They
+are released if their process dies, and are not taken on platforms without
+``fcntl``.
+"""
+
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from .constants import (
+    BENCHMARKS_FOLDER,
+    DATA_ROOT,
+    DATA_ROOT_ENV,
+    IMAGES_FOLDER,
+    MESHES_FOLDER,
+    SOLUTIONS_FOLDER,
+    SOLUTIONS_MAX_BYTES,
+    SOLUTIONS_MAX_BYTES_ENV,
+    SWEEPS_FOLDER,
+)
+from .instrumentation import stage
+
+LOCKS_FOLDER = "locks"  # under the data root
+
+_held_locks = {}  # lock name to (file descriptor, depth), in this process
+
+
+def data_root() -> str:
+    "Returns the root folder of the store"
+    return os.environ.get(DATA_ROOT_ENV) or DATA_ROOT
+
+
+def set_data_root(root: str):
+    "Moves the store of this process, and of the workers it spawns, to root"
+    os.environ[DATA_ROOT_ENV] = str(root)
+
+
+def solutions_max_bytes():
+    """
+    Returns the size bound of the solutions folder, from the
+    ``SOLUTIONS_MAX_BYTES_ENV`` environment variable or ``SOLUTIONS_MAX_BYTES``.
+    None means unbounded.
+    """
+    max_bytes = os.environ.get(SOLUTIONS_MAX_BYTES_ENV)
+    return SOLUTIONS_MAX_BYTES if not max_bytes else int(max_bytes)
+
+
+def set_solutions_max_bytes(max_bytes):
+    """
+    Bounds the solutions folder of this process, and of the workers it spawns,
+    to max_bytes, or lifts the bound with None.
+    """
+    if max_bytes is None:
+        os.environ.pop(SOLUTIONS_MAX_BYTES_ENV, None)
+    else:
+        os.environ[SOLUTIONS_MAX_BYTES_ENV] = str(int(max_bytes))
+
+
+def meshes_folder() -> str:
+    "Returns the folder of the processed meshes in the store"
+    return os.path.join(data_root(), MESHES_FOLDER)
+
+
+def solutions_folder() -> str:
+    "Returns the folder of the solutions and their index in the store"
+    return os.path.join(data_root(), SOLUTIONS_FOLDER)
+
+
+def images_folder() -> str:
+    "Returns the folder of the figures"
+    return os.path.join(data_root(), IMAGES_FOLDER)
+
+
+def sweeps_folder() -> str:
+    "Returns the folder of the sweep manifests"
+    return os.path.join(data_root(), SWEEPS_FOLDER)
+
+
+def benchmarks_folder() -> str:
+    "Returns the folder of the benchmark results and baseline"
+    return os.path.join(data_root(), BENCHMARKS_FOLDER)
+
+
+def make_parent_folders(files):
+    "Creates the folders the given files go in, if they do not exist"
+    for folder in {os.path.dirname(this_file) for this_file in files}:
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+
+def _temporary_name(target_file):
+    "Returns a name next to target_file, unique to this process"
+    return f"{target_file}.{os.getpid()}.tmp"
+
+
+def atomic_save(target_file, array):
+    "Saves the array as .npy, replacing target_file in a single step"
+    make_parent_folders([target_file])
+    tmp_file = _temporary_name(target_file)
+    try:
+        with open(tmp_file, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_file, target_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def atomic_write_text(target_file, text):
+    "Writes the text, replacing target_file in a single step"
+    make_parent_folders([target_file])
+    tmp_file = _temporary_name(target_file)
+    try:
+        with open(tmp_file, "w") as f:
+            f.write(text)
+        os.replace(tmp_file, target_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+@contextmanager
+def key_lock(name: str):
+    """
+    Holds the lock of a cache key, or of any other name, waiting for it if
+    another process holds it. Locks are re-entrant within a process.
+    """
+    try:
+        import fcntl
+    except ImportError:  # not available on Windows, writes stay atomic
+        yield
+        return
+
+    if name in _held_locks:
+        fd, depth = _held_locks[name]
+        _held_locks[name] = (fd, depth + 1)
+    else:
+        lock_file = os.path.join(data_root(), LOCKS_FOLDER, f"{name}.lock")
+        make_parent_folders([lock_file])
+        fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        with stage("lock_wait", lock=name):
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        _held_locks[name] = (fd, 1)
+    try:
+        yield
+    finally:
+        fd, depth = _held_locks[name]
+        if depth > 1:
+            _held_locks[name] = (fd, depth - 1)
+        else:
+            del _held_locks[name]
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -0,0 +1,197 @@
+"""
+Solve many independent problems in parallel, sharing the solution cache.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+from .cache import find_similar_entry, problem_spec, similarity_key, spec_key
+from .fem_solver import retrieve_eigenvalues, retrieve_solution
+from .instrumentation import record_stages
+from .utils import check_solution_cached, generate_solution_filenames
+
+BLAS_THREADS_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def _spectrum_kwargs(spec):
+    "Returns the retrieve_solution keyword arguments of a spec, but the geometry"
+    return {
+        key: value
+        for key, value in spec.items()
+        if key not in ("geometry_type", "params")
+    }
+
+
+def sweep_problem_spec(spec):
+    "Returns the canonical problem spec, see cache.problem_spec, of a sweep spec"
+    return problem_spec(spec["geometry_type"], spec["params"], **_spectrum_kwargs(spec))
+
+
+def _is_cached(spec, eigvals_only=False):
+    files_dict = generate_solution_filenames(
+        spec["geometry_type"], spec["params"], **_spectrum_kwargs(spec)
+    )
+    if eigvals_only:
+        return os.path.exists(files_dict["eigvals"])
+    return check_solution_cached(files_dict)
+
+
+def _solve_spec(spec, eigvals_only=False):
+    retrieve = retrieve_eigenvalues if eigvals_only else retrieve_solution
+    return retrieve(spec["geometry_type"], spec["params"], **_spectrum_kwargs(spec))
+
+
+def _process_peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes, if known. It
+    is a high-water mark over the lifetime of the process, not of one solve.
+    """
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+
+
+def _solve_spec_with_stats(spec, trace_stages=False, eigvals_only=False):
+    """
+    Solves a spec, returning the solution and its wall time, the peak RSS of the
+    process so far, and with ``trace_stages`` the records of its stages, see
+    ``instrumentation``.
+    """
+    start = time.perf_counter()
+    if trace_stages:
+        with record_stages() as records:
+            solution = _solve_spec(spec, eigvals_only)
+    else:
+        solution = _solve_spec(spec, eigvals_only)
+    stats = {
+        "time": time.perf_counter() - start,
+        "process_peak_rss": _process_peak_rss(),
+    }
+    if trace_stages:
+        stats["stages"] = records
+    return solution, stats
+
+
+class _BlasThreadsLimit:
+    "Sets the BLAS thread count in the environment that spawned workers inherit"
+
+    def __init__(self, n_threads):
+        self.n_threads = str(n_threads)
+        self.old_values = {}
+
+    def __enter__(self):
+        for var in BLAS_THREADS_VARS:
+            self.old_values[var] = os.environ.get(var)
+            os.environ[var] = self.n_threads
+
+    def __exit__(self, *exc_info):
+        for var, value in self.old_values.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def solve_many(
+    specs,
+    workers: int = None,
+    blas_threads: int = 1,
+    return_stats: bool = False,
+    trace_stages: bool = False,
+    eigvals_only: bool = False,
+):
+    """
+    Solves many problems in a process pool, yielding ``(i, solution)`` pairs as
+    they finish, where ``i`` is the position of the spec in ``specs``.
+
+    Each spec is a dict with ``geometry_type`` and ``params`` and, optionally,
+    the ``n_modes``, ``eigval_max`` and ``solver`` arguments of
+    ``retrieve_solution``. Cached solutions are yielded first, without going
+    through the pool, and repeated specs are solved only once. Specs whose
+    meshes are uniform scalings of each other are solved once too, the rest
+    being derived from that solution as it arrives. Workers are spawned with
+    ``blas_threads`` BLAS threads each, so that ``workers`` processes do not
+    oversubscribe the cores.
+
+    With ``return_stats``, ``(i, solution, stats)`` triples are yielded, where
+    ``stats`` holds the wall time of the retrieval and the peak RSS of the
+    process that made it, over the lifetime of the process: workers are
+    reused, so it is the largest of the runs they made so far. With ``trace_stages`` too, it also holds the records
+    of each stage of the retrieval, see ``instrumentation.record_stages``.
+
+    With ``eigvals_only``, the eigenvalues of each spec are yielded instead of
+    its solution, retrieved with ``retrieve_eigenvalues``.
+    """
+
+    def result(i, solution_stats):
+        return (i, *solution_stats) if return_stats else (i, solution_stats[0])
+
+    indices_by_key = {}
+    for i, spec in enumerate(specs):
+        indices_by_key.setdefault(spec_key(sweep_problem_spec(spec)), []).append(i)
+
+    # first index of each uncached spec, grouped by similarity
+    groups = {}
+    for key, indices in indices_by_key.items():
+        spec = specs[indices[0]]
+        if _is_cached(spec, eigvals_only):
+            solution_stats = _solve_spec_with_stats(spec, trace_stages, eigvals_only)
+            for i in indices:
+                yield result(i, solution_stats)
+        else:
+            group_key = similarity_key(sweep_problem_spec(spec)) or key
+            groups.setdefault(group_key, []).append(indices[0])
+
+    if not groups:
+        return
+
+    same_key_indices = {indices[0]: indices for indices in indices_by_key.values()}
+    followers = {group[0]: group[1:] for group in groups.values()}
+    workers = min(workers or os.cpu_count(), len(groups))
+    with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as executor:
+        # spawned workers start on the first submit and inherit the environment
+        with _BlasThreadsLimit(blas_threads):
+            futures = {
+                executor.submit(
+                    _solve_spec_with_stats, specs[first], trace_stages, eigvals_only
+                ): first
+                for first in followers
+            }
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                first = futures.pop(future)
+                solution_stats = future.result()
+                for i in same_key_indices[first]:
+                    yield result(i, solution_stats)
+
+                for follower in followers.pop(first, []):
+                    spec = specs[follower]
+                    similar = find_similar_entry(
+                        sweep_problem_spec(spec), eigvecs=not eigvals_only
+                    )
+                    if similar is None:
+                        future = executor.submit(
+                            _solve_spec_with_stats, spec, trace_stages, eigvals_only
+                        )
+                        futures[future] = follower
+                        continue
+                    # derived from the solution that just arrived, no solve
+                    solution_stats = _solve_spec_with_stats(
+                        spec, trace_stages, eigvals_only
+                    )
+                    for i in same_key_indices[follower]:
+                        yield result(i, solution_stats)
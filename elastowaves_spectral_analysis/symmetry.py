@@ -0,0 +1,367 @@
+"""
+Symmetry-reduced solves of the domains with reflection symmetries.
+
+The square and the circle are symmetric about two perpendicular axes, and the
+right isosceles triangle about its bisector. Every mode is then symmetric or
+antisymmetric about each axis, so only the fundamental sector is meshed, and
+it is solved once per combination of parities, each a smaller eigenproblem.
+On an axis, a symmetric mode has no displacement normal to it and an
+antisymmetric mode none along it, the tractions left being natural conditions.
+
+The spectra of the parity problems are merged, and the full eigenvectors are
+rebuilt by reflecting the sector ones onto the mesh made of the sector mesh
+and its reflections.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from .assembly import assemble_tri6
+from .constants import NODE_REORDERING
+from .eigensolvers import solve_eigenproblem
+from .gmesher import generate_mesh, mesh_to_arrays
+from .instrumentation import stage
+from .mesh_transfer import nodal_modes, reduced_modes
+from .reordering import reorder_mesh
+
+AXIS_TOLERANCE = 1e-9  # distance of the nodes on an axis, relative to the sector
+MODES_MARGIN = 1.2  # modes asked per parity problem, over its share of n_modes
+# 6-node triangle reordered after a reflection, to keep it counterclockwise
+REFLECTED_TRI6 = [0, 2, 1, 5, 4, 3]
+
+
+def _square_axes(side: float, mesh_size: float):
+    return [((side / 2, 0), (1, 0)), ((0, side / 2), (0, 1))]
+
+
+def _triangle_axes(cathetus: float, mesh_size: float):
+    return [((0, 0), (1, -1))]
+
+
+def _circle_axes(radius: float, mesh_size: float):
+    return [((0, 0), (1, 0)), ((0, 0), (0, 1))]
+
+
+# symmetry axes as (point, normal) pairs, for the sectors in gmesher
+SYMMETRY_AXES = {
+    "square": _square_axes,
+    "triangle": _triangle_axes,
+    "circle": _circle_axes,
+}
+
+
+def symmetry_axes(geometry_type: str, params: dict):
+    "Returns the symmetry axes of the domain, as (point, unit normal) pairs"
+    if geometry_type not in SYMMETRY_AXES:
+        raise ValueError(f"No symmetry known for geometry type: {geometry_type}")
+    axes = []
+    for point, normal in SYMMETRY_AXES[geometry_type](**params):
+        normal = np.asarray(normal, dtype=float)
+        axes.append((np.asarray(point, dtype=float), normal / np.linalg.norm(normal)))
+    return axes
+
+
+def _on_axes(coords, axes):
+    "Returns which axes each point lies on, as a (n_points, n_axes) array"
+    tolerance = AXIS_TOLERANCE * np.ptp(coords, axis=0).max()
+    return np.column_stack(
+        [np.abs((coords - point) @ normal) < tolerance for point, normal in axes]
+    )
+
+
+def _reflection(axes, code):
+    "Returns the linear part of the reflections about the axes in the bit code"
+    matrix = np.eye(2)
+    for bit, (_, normal) in enumerate(axes):
+        if code >> bit & 1:
+            matrix = (np.eye(2) - 2 * np.outer(normal, normal)) @ matrix
+    return matrix
+
+
+def _reflect(coords, axes, code):
+    "Reflects the points about the axes in the bit code, which commute"
+    for bit, (point, normal) in enumerate(axes):
+        if code >> bit & 1:
+            coords = coords - 2 * np.outer((coords - point) @ normal, normal)
+    return coords
+
+
+def _sector_mesh(geometry_type, params, axes):
+    """
+    Returns cons, elements, nodes, assem_op, bc_array and the axes each node
+    lies on, for the sector. Only the boundary off the axes is clamped.
+    """
+    import solidspy.assemutil as ass
+
+    with stage("mesh_generation", sector=True):
+        points, tri6, line3 = generate_mesh(geometry_type, params, sector=True)
+
+    with stage("dof_numbering") as record:
+        on_axis = _on_axes(points[:, :2], axes)
+        clamped_lines = ~np.any(np.all(on_axis[line3], axis=1), axis=1)
+        cons, elements, nodes = mesh_to_arrays(points, tri6, line3[clamped_lines])
+        cons, elements, nodes = reorder_mesh(cons, elements, nodes, NODE_REORDERING)
+        assem_op, bc_array, neq = ass.DME(cons, elements, ndof_node=2, ndof_el_max=12)
+        record["neq"] = int(neq)
+    return cons, elements, nodes, assem_op, bc_array, _on_axes(nodes[:, 1:], axes)
+
+
+def _parity_basis(bc_array, on_axis, axes, parities):
+    """
+    Returns the sparse basis (neq, n_reduced) of the sector displacements with
+    the given parities, +1 symmetric and -1 antisymmetric about each axis.
+    """
+    free = np.all(bc_array != -1, axis=1)
+    directions = np.tile(np.eye(2), (len(bc_array), 1, 1))
+    n_directions = np.where(free, 2, 0)
+    for node in np.flatnonzero(free & np.any(on_axis, axis=1)):
+        # displacements normal to symmetric axes, along antisymmetric ones
+        constrained = np.array(
+            [
+                normal if parity > 0 else [-normal[1], normal[0]]
+                for (_, normal), parity, on in zip(axes, parities, on_axis[node])
+                if on
+            ]
+        )
+        if np.linalg.matrix_rank(constrained) == 2:
+            n_directions[node] = 0
+        else:
+            directions[node, 0] = [-constrained[0, 1], constrained[0, 0]]
+            n_directions[node] = 1
+
+    first_column = np.cumsum(n_directions) - n_directions
+    node_ids, direction_ids = np.nonzero(np.arange(2) < n_directions[:, None])
+    columns = first_column[node_ids] + direction_ids
+    rows = bc_array[node_ids].T.ravel()
+    values = directions[node_ids, direction_ids].T.ravel()
+    columns = np.tile(columns, 2)
+    keep = np.abs(values) > AXIS_TOLERANCE
+    shape = (int(bc_array.max()) + 1, int(n_directions.sum()))
+    return coo_matrix((values[keep], (rows[keep], columns[keep])), shape=shape).tocsc()
+
+
+def _solve_parities(problems, n_modes, eigval_max, solver, return_eigvecs, workers):
+    """
+    Solves each ``(K, M)`` parity problem for enough modes that the merged
+    spectrum holds the first ``n_modes``. Returns the eigenvalues and
+    eigenvectors of each.
+
+    Each problem is first asked for its share of the modes, about the same
+    for every parity by Weyl's law. A problem may hide modes below the
+    ``n_modes``-th merged eigenvalue until its highest one is above it, and is
+    then solved again for twice as many modes.
+    """
+    sizes = [stiff_mat.shape[0] for stiff_mat, _ in problems]
+    if n_modes is None:
+        asked = [None] * len(problems)
+    else:
+        share = int(np.ceil(MODES_MARGIN * n_modes / len(problems))) + 1
+        asked = [min(share, neq) for neq in sizes]
+    results = [None] * len(problems)
+    pending = list(range(len(problems)))
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=get_context("spawn"))
+    try:
+        while pending:
+            # a request close to the problem size is the whole spectrum
+            requests = [
+                None if asked[i] is None or asked[i] >= sizes[i] - 1 else asked[i]
+                for i in pending
+            ]
+            args = (
+                [problems[i][0] for i in pending],
+                [problems[i][1] for i in pending],
+                requests,
+                [eigval_max] * len(pending),
+                [solver] * len(pending),
+                [return_eigvecs] * len(pending),
+            )
+            if pool is None or len(pending) < 2:
+                solved = map(solve_eigenproblem, *args)
+            else:
+                solved = pool.map(solve_eigenproblem, *args)
+            for i, request, result in zip(pending, requests, solved):
+                results[i] = result
+                if request is None or len(result[0]) < request:
+                    asked[i] = None  # every mode below eigval_max is known
+
+            merged = np.sort(np.concatenate([eigvals for eigvals, _ in results]))
+            if n_modes is None or len(merged) < n_modes:
+                target = np.inf
+            else:
+                target = merged[n_modes - 1]
+            pending = [
+                i
+                for i in range(len(problems))
+                if asked[i] is not None and results[i][0][-1] < target
+            ]
+            for i in pending:
+                asked[i] = min(2 * asked[i], sizes[i])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+
+def _solve_sectors(
+    geometry_type, params, mats, n_modes, eigval_max, solver, return_eigvecs, workers
+):
+    """
+    Returns the sector mesh arrays and the merged eigenvalues, sector
+    eigenvectors (None without ``return_eigvecs``) and parities of the modes.
+    """
+    axes = symmetry_axes(geometry_type, params)
+    cons, elements, nodes, assem_op, bc_array, on_axis = _sector_mesh(
+        geometry_type, params, axes
+    )
+    neq = int(bc_array.max()) + 1
+    with stage("assembly", neq=neq) as record:
+        stiff_mat, mass_mat = assemble_tri6(elements, mats, nodes, neq, assem_op)
+        record["nnz"] = stiff_mat.nnz
+
+    all_parities = list(product((1, -1), repeat=len(axes)))
+    bases, problems = [], []
+    with stage("symmetry_reduction", n_parities=len(all_parities)) as record:
+        for parities in all_parities:
+            basis = _parity_basis(bc_array, on_axis, axes, parities)
+            bases.append(basis)
+            problems.append(
+                (
+                    (basis.T @ stiff_mat @ basis).tocsr(),
+                    (basis.T @ mass_mat @ basis).tocsr(),
+                )
+            )
+        record["neq"] = [basis.shape[1] for basis in bases]
+
+    results = _solve_parities(
+        problems, n_modes, eigval_max, solver, return_eigvecs, workers
+    )
+    eigvals = np.concatenate([result[0] for result in results])
+    parities = np.concatenate(
+        [
+            np.tile(parities, (len(result[0]), 1))
+            for parities, result in zip(all_parities, results)
+        ]
+    ).reshape(-1, len(axes))
+    order = np.argsort(eigvals, kind="stable")[:n_modes]
+
+    eigvecs = None
+    if return_eigvecs:
+        eigvecs = np.hstack(
+            [basis @ result[1] for basis, result in zip(bases, results)]
+        )
+        eigvecs = eigvecs[:, order]
+    sector = {
+        "axes": axes,
+        "cons": cons,
+        "elements": elements,
+        "nodes": nodes,
+        "bc_array": bc_array,
+        "on_axis": on_axis,
+    }
+    return sector, eigvals[order], eigvecs, parities[order]
+
+
+def _reflected_mesh(sector):
+    """
+    Returns cons, elements and nodes of the full mesh, made of the sector and
+    its reflections, and the full index of each sector node for each
+    combination of reflections, given as bit codes over the axes.
+    """
+    axes, n_nodes = sector["axes"], len(sector["nodes"])
+    codes = np.arange(2 ** len(axes))
+    # a node on an axis is its own reflection about it
+    on_axis_code = sector["on_axis"].astype(int) @ 2 ** np.arange(len(axes))
+    keys = [(code & ~on_axis_code) * n_nodes + np.arange(n_nodes) for code in codes]
+    unique_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    node_index = inverse.reshape(len(codes), n_nodes)
+
+    nodes = np.zeros((len(unique_keys), 3))
+    nodes[:, 0] = np.arange(len(unique_keys))
+    for code in codes:
+        image = node_index[code]
+        nodes[image, 1:] = _reflect(sector["nodes"][:, 1:], axes, code)
+
+    cons = np.zeros((len(unique_keys), 2), dtype=int)
+    all_elements = []
+    for code in codes:
+        cons[node_index[code]] = sector["cons"]
+        elements = sector["elements"].copy()
+        elements[:, 3:] = node_index[code][elements[:, 3:]]
+        if bin(code).count("1") % 2:
+            elements[:, 3:] = elements[:, 3:][:, REFLECTED_TRI6]
+        all_elements.append(elements)
+    elements = np.vstack(all_elements)
+    elements[:, 0] = np.arange(len(elements))
+    return cons, elements, nodes, node_index
+
+
+def _reflected_modes(sector, eigvecs, parities, node_index, bc_array):
+    "Returns the M-normalized full eigenvectors, from the sector ones"
+    axes = sector["axes"]
+    nodal = nodal_modes(sector["bc_array"], eigvecs)
+    full_nodal = np.zeros((int(node_index.max()) + 1, 2, nodal.shape[-1]))
+    for code, image in enumerate(node_index):
+        reflected = np.array([code >> bit & 1 for bit in range(len(axes))], bool)
+        # antisymmetric modes change sign with each reflection
+        signs = np.prod(np.where(reflected, parities, 1), axis=1)
+        matrix = _reflection(axes, code)
+        full_nodal[image] = np.einsum("ij,njm->nim", matrix, nodal) * signs
+    # the full domain is len(node_index) copies of the sector
+    full_nodal /= np.sqrt(len(node_index))
+    return reduced_modes(bc_array, full_nodal)
+
+
+def symmetric_eigenvalues(
+    geometry_type: str,
+    params: dict,
+    mats,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    workers: int = 1,
+):
+    """
+    Returns the eigenvalues of the domain, solved on its fundamental sector,
+    see ``solve_symmetric``.
+    """
+    _, eigvals, _, _ = _solve_sectors(
+        geometry_type, params, mats, n_modes, eigval_max, solver, False, workers
+    )
+    return eigvals
+
+
+def solve_symmetric(
+    geometry_type: str,
+    params: dict,
+    mats,
+    n_modes: int = None,
+    eigval_max: float = None,
+    solver: str = "auto",
+    workers: int = 1,
+):
+    """
+    Returns bc_array, eigvals, eigvecs, nodes and elements of the domain,
+    solved on its fundamental sector once per combination of parities.
+
+    The spectral request and ``solver`` are those of ``solve_eigenproblem``,
+    and ``mats`` is the solidspy material array. The parity problems are
+    solved in parallel with ``workers`` processes. The mesh returned is the
+    sector mesh and its reflections, which the eigenvectors are rebuilt on.
+    """
+    import solidspy.assemutil as ass
+
+    sector, eigvals, eigvecs, parities = _solve_sectors(
+        geometry_type, params, mats, n_modes, eigval_max, solver, True, workers
+    )
+    with stage("symmetry_reconstruction", n_modes=len(eigvals)):
+        cons, elements, nodes, node_index = _reflected_mesh(sector)
+        _, bc_array, _ = ass.DME(cons, elements, ndof_node=2, ndof_el_max=12)
+        eigvecs = _reflected_modes(sector, eigvecs, parities, node_index, bc_array)
+    return bc_array, eigvals, eigvecs, nodes, elements
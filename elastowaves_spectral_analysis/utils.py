@@ -2,34 +2,78 @@ import os
 
 import numpy as np
 
-from .constants import MESHES_FOLDER, SIDE_TO_MESH_SIZE_RATIO, SOLUTIONS_FOLDER
+from .cache import mesh_spec, problem_spec, spec_key
+from .constants import SIDE_TO_MESH_SIZE_RATIO
+from .storage import atomic_save, images_folder, meshes_folder, solutions_folder
+
+
+def init_workspace():
+    "Creates the store and images folders, if they do not exist"
+    for folder in (meshes_folder(), solutions_folder(), images_folder()):
+        os.makedirs(folder, exist_ok=True)
 
 
 def _parse_solution_identifier(geometry_type, params):
-    "Returnss strign associated with run parameters"
+    "Returns the string that identified a run before content-addressed keys"
 
     params_str = [
         str(this_key) + "_" + str(this_value).replace(".", "")
         for this_key, this_value in params.items()
-    ]  # TODO: if value is 1.0, it is left as 10, which may be confusing later...
+    ]  # lossy, 1.0 and 10 collide; only used to find legacy caches
 
     filename = geometry_type + "-" + "-".join(params_str)
 
     return filename
 
 
-def generate_solution_filenames(geometry_type, params):
-    "Returns filenames for solution files"
+SOLUTION_ARRAYS = ("bc_array", "eigvals", "eigvecs", "nodes", "elements")
+LEGACY_CSV_ARRAYS = ("bc_array", "eigvals", "eigvecs")
+
+
+def generate_solution_filenames(
+    geometry_type,
+    params,
+    n_modes=None,
+    eigval_max=None,
+    solver="auto",
+    material=None,
+    symmetry=False,
+):
+    "Returns filenames for solution files, named after their cache keys"
+    spec = problem_spec(
+        geometry_type, params, n_modes, eigval_max, solver, material, symmetry
+    )
+    solution_key = spec_key(spec)
+    files_dict = {
+        array_name: f"{solutions_folder()}/{solution_key}-{array_name}.npy"
+        for array_name in SOLUTION_ARRAYS
+    }
+    files_dict["mesh"] = f"{meshes_folder()}/{spec_key(mesh_spec(spec))}.msh"
+    return files_dict
+
+
+def legacy_csv_filenames(geometry_type, params):
+    """
+    Returns the filenames used for CSV solution files before the .npy store,
+    which held full spectra.
+    """
     solution_id = _parse_solution_identifier(geometry_type, params)
-    bc_array_file = f"{SOLUTIONS_FOLDER}/{solution_id}-bc_array.csv"
-    eigvals_file = f"{SOLUTIONS_FOLDER}/{solution_id}-eigvals.csv"
-    eigvecs_file = f"{SOLUTIONS_FOLDER}/{solution_id}-eigvecs.csv"
-    mesh_file = f"{MESHES_FOLDER}/{solution_id}.msh"
+    files_dict = {
+        array_name: f"{solutions_folder()}/{solution_id}-{array_name}.csv"
+        for array_name in LEGACY_CSV_ARRAYS
+    }
+    files_dict["mesh"] = f"{meshes_folder()}/{solution_id}.msh"
+    return files_dict
+
+
+MESH_ARRAYS = ("cons", "elements", "nodes", "assem_op", "bc_array")
+
+
+def generate_mesh_array_filenames(mesh_file):
+    "Returns filenames for the processed mesh arrays stored next to the mesh"
     return {
-        "bc_array": bc_array_file,
-        "eigvals": eigvals_file,
-        "eigvecs": eigvecs_file,
-        "mesh": mesh_file,
+        array_name: mesh_file.replace(".msh", f"-{array_name}.npy")
+        for array_name in MESH_ARRAYS
     }
 
 
@@ -38,20 +82,70 @@ def check_solution_files_exists(files_dict):
     return all([os.path.exists(this_file) for this_file in files_dict.values()])
 
 
-def load_solution_files(files_dict):
-    "Loads solution files"
-    bc_array = np.loadtxt(files_dict["bc_array"], delimiter=",", dtype=int)
+def check_solution_cached(files_dict):
+    "Checks if the solution arrays exist, the mesh file being optional"
+    return check_solution_files_exists(
+        {array_name: files_dict[array_name] for array_name in SOLUTION_ARRAYS}
+    )
+
+
+def load_solution_files(files_dict, mmap_mode="r", load_eigvecs=True):
+    """
+    Loads solution files.
+
+    The eigenvectors are memory-mapped with ``mmap_mode``, so they are only
+    read from disk when accessed; pass ``mmap_mode=None`` to load them in RAM.
+    With ``load_eigvecs=False`` they are not opened and ``None`` is returned.
+    """
+    bc_array = np.load(files_dict["bc_array"])
+    eigvals = np.load(files_dict["eigvals"])
+    eigvecs = (
+        np.load(files_dict["eigvecs"], mmap_mode=mmap_mode) if load_eigvecs else None
+    )
+    nodes = np.load(files_dict["nodes"])
+    elements = np.load(files_dict["elements"])
+    return bc_array, eigvals, eigvecs, nodes, elements
+
+
+def save_solution_files(bc_array, eigvals, eigvecs, nodes, elements, files_dict):
+    """
+    Saves solution files, eigenvectors column-major so each mode is contiguous.
+    Each file appears complete or not at all, see ``storage.atomic_save``.
+    """
+    atomic_save(files_dict["bc_array"], bc_array)
+    atomic_save(files_dict["eigvals"], eigvals)
+    atomic_save(files_dict["eigvecs"], np.asfortranarray(eigvecs))
+    atomic_save(files_dict["nodes"], nodes)
+    atomic_save(files_dict["elements"], elements)
+
+
+def load_mesh_arrays(mesh_array_files):
+    "Loads processed mesh arrays, in the order of MESH_ARRAYS"
+    return tuple(np.load(mesh_array_files[array_name]) for array_name in MESH_ARRAYS)
+
+
+def save_mesh_arrays(cons, elements, nodes, assem_op, bc_array, mesh_array_files):
+    "Saves processed mesh arrays, each in a single step"
+    atomic_save(mesh_array_files["cons"], cons)
+    atomic_save(mesh_array_files["elements"], elements)
+    atomic_save(mesh_array_files["nodes"], nodes)
+    atomic_save(mesh_array_files["assem_op"], assem_op)
+    atomic_save(mesh_array_files["bc_array"], bc_array)
+
+
+def load_legacy_csv_files(csv_files):
+    "Loads solution files from the old CSV store"
+    # integers were saved as floats, which loadtxt no longer parses as int
+    bc_array = np.loadtxt(csv_files["bc_array"], delimiter=",").astype(int)
     bc_array = bc_array.reshape(-1, 1) if bc_array.ndim == 1 else bc_array
-    eigvals = np.loadtxt(files_dict["eigvals"], delimiter=",")
-    eigvecs = np.loadtxt(files_dict["eigvecs"], delimiter=",")
+    eigvals = np.loadtxt(csv_files["eigvals"], delimiter=",")
+    eigvecs = np.loadtxt(csv_files["eigvecs"], delimiter=",")
     return bc_array, eigvals, eigvecs
 
 
-def save_solution_files(bc_array, eigvals, eigvecs, files_dict):
-    "Saves solution files"
-    np.savetxt(files_dict["bc_array"], bc_array, delimiter=",")
-    np.savetxt(files_dict["eigvals"], eigvals, delimiter=",")
-    np.savetxt(files_dict["eigvecs"], eigvecs, delimiter=",")
+def load_legacy_csv_eigvals(csv_files):
+    "Loads only the eigenvalues of a solution in the old CSV store"
+    return np.loadtxt(csv_files["eigvals"], delimiter=",")
 
 
 def square_mesh_params_from_area(area: float):
@@ -2,8 +2,10 @@ import numpy as np
 import matplotlib.pyplot as plt
 import solidspy.postprocesor as pos # noqa: F401
 
-from elastowaves_spectral_analysis.fem_solver import retrieve_solution
-from elastowaves_spectral_analysis.constants import IMAGES_FOLDER
+from elastowaves_spectral_analysis.fem_solver import retrieve_eigenvalues
+from elastowaves_spectral_analysis.isospectrality import compare_spectra
+from elastowaves_spectral_analysis.storage import images_folder
+from elastowaves_spectral_analysis.utils import init_workspace
 
 
 def compare_eigenvals():
@@ -16,7 +18,7 @@ def compare_eigenvals():
     eigvalss = []
 
     for geometry_type, params in zip(geometry_types, paramss):
-        _, eigvals, _, _, _ = retrieve_solution(geometry_type, params)
+        eigvals = retrieve_eigenvalues(geometry_type, params)
         eigvalss.append(eigvals[:eigval_limit])
 
     relative_error = (abs(eigvalss[0] - eigvalss[1]) / eigvalss[0]) * 100
@@ -32,8 +34,9 @@ def compare_eigenvals():
     ax2.set_xlabel("Eigenvalue index")
     ax2.set_ylabel("Relative Error (%)")
 
+    init_workspace()
     plt.savefig(
-        f'{IMAGES_FOLDER}/eigenvals_comparison_{"-".join(geometry_types)}.png', dpi=300
+        f'{images_folder()}/eigenvals_comparison_{"-".join(geometry_types)}.png', dpi=300
     )
     plt.show()
 
@@ -41,5 +44,19 @@ def compare_eigenvals():
     print(f"Average relative error: {avg_relative_error}")
 
 
+def check_isospectral(n_modes=1000):
+    "Compares the pair band by band, stopping at the first differing mode"
+    result = compare_spectra(("isospectral_1_1", {}), ("isospectral_1_2", {}), n_modes)
+    if result["isospectral"]:
+        print(f"The first {n_modes} eigenvalues agree")
+    else:
+        mode = result["first_difference"]
+        print(
+            f"Mode {mode} differs: relative difference {result['rel_diff'][mode]:.2e}"
+            f" above tolerance {result['tol'][mode]:.2e}"
+        )
+
+
 if __name__ == "__main__":
+    check_isospectral()
     compare_eigenvals()
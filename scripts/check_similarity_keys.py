@@ -0,0 +1,36 @@
+import numpy as np
+
+from elastowaves_spectral_analysis.cache import problem_spec, similarity_key
+from elastowaves_spectral_analysis.utils import (
+    circle_mesh_params_from_area,
+    square_mesh_params_from_area,
+    triangle_mesh_params_from_area,
+)
+
+PARAMS_FROM_AREA = {
+    "square": square_mesh_params_from_area,
+    "triangle": triangle_mesh_params_from_area,
+    "circle": circle_mesh_params_from_area,
+}
+
+
+def similarity_keys(geometry_type, areas):
+    "Returns the similarity keys of a sweep of the domain over the areas"
+    params_from_area = PARAMS_FROM_AREA[geometry_type]
+    return {
+        similarity_key(problem_spec(geometry_type, params_from_area(area)))
+        for area in areas
+    }
+
+
+def main():
+    # an area sweep is solved once per shape, every other area being a rescaling
+    areas = np.linspace(1, 1000, 100)
+    for geometry_type in PARAMS_FROM_AREA:
+        keys = similarity_keys(geometry_type, areas)
+        assert len(keys) == 1, f"{geometry_type}: {len(keys)} similarity keys"
+        print(f"{geometry_type}: one similarity key over {len(areas)} areas")
+
+
+if __name__ == "__main__":
+    main()
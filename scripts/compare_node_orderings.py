@@ -0,0 +1,23 @@
+from elastowaves_spectral_analysis.fem_solver import node_ordering_report
+
+
+def main():
+    geometries = [
+        ("square", {"side": 1.0, "mesh_size": 0.05}),
+        ("circle", {"radius": 1.0, "mesh_size": 0.05}),
+        ("isospectral_1_1", {}),
+        ("isospectral_2_1", {}),
+    ]
+
+    for geometry_type, params in geometries:
+        report = node_ordering_report(geometry_type, params)
+        print(geometry_type, params)
+        for method, stats in report.items():
+            print(
+                f"  {str(method):>5}: neq={stats['neq']}, nnz={stats['nnz']}, "
+                f"bandwidth={stats['bandwidth']}, LU nnz={stats['lu_nnz']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from elastowaves_spectral_analysis.fem_solver import retrieve_solution
+from elastowaves_spectral_analysis.instrumentation import record_stages
+
+
+def eigensolve_record(records):
+    return next(record for record in records if record["stage"] == "eigensolve")
+
+
+def main():
+    geometry_type = "square"
+    coarse_params = {"side": 1.0, "mesh_size": 0.075}
+    fine_params = {"side": 1.0, "mesh_size": 0.05}
+    n_modes = 50
+    solvers = ["shift_invert", "lobpcg"]
+
+    for solver in solvers:
+        coarse = retrieve_solution(
+            geometry_type, coarse_params, n_modes=n_modes, solver=solver
+        )
+        for initial_solution in (None, coarse):
+            with record_stages(trace_memory=False) as records:
+                retrieve_solution(
+                    geometry_type,
+                    fine_params,
+                    force_reprocess=True,
+                    n_modes=n_modes,
+                    solver=solver,
+                    initial_solution=initial_solution,
+                )
+            record = eigensolve_record(records)
+            start = "warm" if record["warm_start"] else "cold"
+            iterations = record.get("iterations", record.get("operator_applications"))
+            print(
+                f"{solver:>12} {start}: {record['time']:.3f} s, "
+                f"{iterations} iterations/operator applications"
+            )
+
+
+if __name__ == "__main__":
+    main()
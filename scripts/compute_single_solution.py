@@ -1,24 +1,17 @@
-import warnings
-
 import matplotlib.pyplot as plt
-import numpy as np
 
 from elastowaves_spectral_analysis.fem_solver import retrieve_solution
-
-warnings.filterwarnings(
-    "ignore", "The following kwargs were not used by contour: 'shading'", UserWarning
-)  # ignore unimportant warning from solidspy
+from elastowaves_spectral_analysis.postprocessing import mesh_triangulation, mode_fields
 
 
 def plot_eigenvec(bc_array, nodes, eigvec, elements):
-    import solidspy.postprocesor as pos
-
-    sol = pos.complete_disp(bc_array, nodes, eigvec, ndof_node=2)
-    pos.plot_node_field(sol[:, 0], nodes, elements)  # x component
-    pos.plot_node_field(sol[:, 1], nodes, elements)  # y component
-    pos.plot_node_field(
-        np.sqrt(sol[:, 0] ** 2 + sol[:, 1] ** 2), nodes, elements
-    )  # disp. amplitude
+    triangulation = mesh_triangulation(nodes, elements)
+    disp_x, disp_y, amplitude = mode_fields(bc_array, eigvec)
+    for field in (disp_x, disp_y, amplitude):  # x, y components and amplitude
+        plt.figure()
+        plt.tricontourf(triangulation, field[:, 0], levels=12, cmap="RdYlBu")
+        plt.colorbar(orientation="vertical")
+        plt.axis("image")
     plt.show()
 
 
@@ -28,11 +21,14 @@ def main():
     force_reprocess = False
     n_eigenvec = 2  # to plot
 
-    bc_array, eigvals, eigvecs, nodes, elements = retrieve_solution(
-        geometry_type, params, force_reprocess=force_reprocess
-    )
+    solution = retrieve_solution(geometry_type, params, force_reprocess=force_reprocess)
 
-    plot_eigenvec(bc_array, nodes, eigvecs[:, n_eigenvec], elements)
+    plot_eigenvec(
+        solution.bc_array,
+        solution.nodes,
+        solution.eigvec(n_eigenvec),
+        solution.elements,
+    )
 
 
 if __name__ == "__main__":
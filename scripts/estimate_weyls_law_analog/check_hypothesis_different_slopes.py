@@ -1,7 +1,8 @@
 import numpy as np
-from scipy.stats import linregress, t
-from tqdm import tqdm
-from utils import calculate_eigenvalues
+from scipy.stats import t
+from utils import calculate_N_R_max_many
+
+from elastowaves_spectral_analysis.spectral_stats import linear_regression
 
 
 def apply_t_test(slope1, slope2, std_err1, std_err2, dof1, dof2):
@@ -31,26 +32,16 @@ def check_slopes_are_different():
 
     combinations = [(shape, area) for area in area_sampling for shape in shapes]
 
-    eigvalss = []
-    for geometry_type, area in tqdm(combinations, desc="Test"):
-        eigvals = calculate_eigenvalues(geometry_type, area)
-        eigvalss.append(eigvals)
+    areas_tested = np.array([area for _, area in combinations])
+    N_R_max = calculate_N_R_max_many(combinations, test_id="check_slopes_are_different")
 
     slopes, std_errs, dofs = [], [], []
     for shape in shapes:
-        shape_eigvalss = [
-            eigvals
-            for eigvals, (this_shape, _) in zip(eigvalss, combinations)
-            if this_shape == shape
-        ]
-        shape_areas_tested = np.array(
-            [area for this_shape, area in combinations if this_shape == shape]
-        )
-        shape_N_R_max = np.array(
-            [len(eigvals) / np.max(eigvals) for eigvals in shape_eigvalss]
-        )
+        is_shape = np.array([this_shape == shape for this_shape, _ in combinations])
+        shape_areas_tested = areas_tested[is_shape]
+        shape_N_R_max = N_R_max[is_shape]
 
-        slope, intercept, r_value, p_value, std_err = linregress(
+        slope, intercept, r_value, std_err = linear_regression(
             shape_N_R_max, shape_areas_tested
         )
         slopes.append(slope)
@@ -2,8 +2,15 @@ import matplotlib.pyplot as plt
 import numpy as np
 from tqdm import tqdm
 
-from elastowaves_spectral_analysis.constants import IMAGES_FOLDER
-from elastowaves_spectral_analysis.fem_solver import retrieve_solution
+from elastowaves_spectral_analysis.manifest import run_sweep
+from elastowaves_spectral_analysis.spectral_stats import (
+    CountingFunction,
+    rsquared_through_origin,
+    slope_through_origin,
+)
+from elastowaves_spectral_analysis.storage import images_folder, sweeps_folder
+from elastowaves_spectral_analysis.sweeps import solve_many
+from elastowaves_spectral_analysis.utils import init_workspace
 
 
 def _calculate_params(geometry_type, area):
@@ -20,24 +27,38 @@ def _calculate_params(geometry_type, area):
     return params
 
 
-def calculate_eigenvalues(geometry_type, area):
-    params = _calculate_params(geometry_type, area)
-    _, eigvals, _, _, _ = retrieve_solution(geometry_type, params)
-    return eigvals
-
-
-def _calculate_N(R, eigvals):
-    """Return the number of eigenvalues less than R."""
-    return np.sum(eigvals < R)
-
-
-def _calculate_slope(x, y):
-    return np.sum(x * y) / np.sum(x**2)
-
-
-def _calculate_rsquared(x, y):
-    r = np.sum(x * y) / np.sqrt(np.sum(x**2) * np.sum(y**2))
-    return r**2
+def _sweep_specs(combinations, eigval_max=None):
+    return [
+        {
+            "geometry_type": geometry_type,
+            "params": _calculate_params(geometry_type, area),
+            "eigval_max": eigval_max,
+        }
+        for geometry_type, area in combinations
+    ]
+
+
+def calculate_eigenvalues_many(combinations, eigval_max=None, workers=None):
+    """Return the eigenvalues of every (geometry_type, area), solved in parallel."""
+    specs = _sweep_specs(combinations, eigval_max)
+    eigvalss = [None] * len(specs)
+    for i, eigvals in tqdm(
+        solve_many(specs, workers=workers, eigvals_only=True),
+        total=len(specs),
+        desc="Test",
+    ):
+        eigvalss[i] = eigvals
+    return eigvalss
+
+
+def calculate_N_R_max_many(combinations, test_id, eigval_max=None, workers=None):
+    """
+    Return N(R_max) / R_max of every (geometry_type, area), from the manifest of
+    the sweep, solving in parallel only the runs it does not hold yet.
+    """
+    manifest_file = f"{sweeps_folder()}/{test_id}.jsonl"
+    rows = run_sweep(_sweep_specs(combinations, eigval_max), manifest_file, workers)
+    return np.array([row["N_R_max"] for row in rows])
 
 
 def _plot_N_R_behavior(eigvalss, shapes, area_sampling, test_id):
@@ -45,12 +66,13 @@ def _plot_N_R_behavior(eigvalss, shapes, area_sampling, test_id):
     colors = ["k", "r", "b", "g", "m", "c"]
     line_styles = ["-", "--", "-.", ":", "-"]
 
-    R = np.min([np.max(eigvals) for eigvals in eigvalss])
-    R = np.ceil(R)
+    counting_function = CountingFunction(eigvalss)
+    R = np.ceil(np.min(counting_function.R_max))
     Rs = np.linspace(1, R, 100)
+    Nss = counting_function(Rs)
 
     plt.figure(figsize=(8, 4))
-    for i, eigvals in enumerate(eigvalss):
+    for i, Ns in enumerate(Nss):
         shape, area = combinations[i]
         shape_id = list(shapes).index(shape)
         line_style = line_styles[shape_id % len(line_styles)]
@@ -58,8 +80,7 @@ def _plot_N_R_behavior(eigvalss, shapes, area_sampling, test_id):
         area_id = list(area_sampling).index(area)
         color = colors[area_id % len(colors)]
 
-        Ns = [_calculate_N(R, eigvals) for R in Rs]
-        plt.plot(Rs, [N/R for N, R in zip(Ns, Rs)], f"{color}{line_style}")
+        plt.plot(Rs, Ns / Rs, f"{color}{line_style}")
 
     plt.xlabel(r"$R$")
     plt.ylabel(r"$N(R)/R$")
@@ -69,14 +90,13 @@ def _plot_N_R_behavior(eigvalss, shapes, area_sampling, test_id):
         bbox_to_anchor=(1, 0.5),
     )
     plt.tight_layout()
-    plt.savefig(f"{IMAGES_FOLDER}/N_R_behavior_{test_id}.png", dpi=300)
+    plt.savefig(f"{images_folder()}/N_R_behavior_{test_id}.png", dpi=300)
     plt.show()
 
 
 def _plot_weyls_law_analog(
-    eigvalss, areas_tested, shapes, area_sampling, test_id, fit_per_shape=False
+    N_R_max, areas_tested, shapes, area_sampling, test_id, fit_per_shape=False
 ):
-    N_R_max = np.array([len(eigvals) / np.max(eigvals) for eigvals in eigvalss])
     plt.figure(figsize=(6, 4))
     marker_styles = ["o", "s", "D", "^", "v", "P"]
     colors = ["b", "g", "m", "c"]
@@ -87,20 +107,12 @@ def _plot_weyls_law_analog(
             color = colors[i % len(colors)]
             shape_id = list(shapes).index(shape)
             marker_style = marker_styles[shape_id]
-            shape_eigvalss = [
-                eigvals
-                for eigvals, (this_shape, _) in zip(eigvalss, combinations)
-                if this_shape == shape
-            ]
-            shape_areas_tested = np.array(
-                [area for this_shape, area in combinations if this_shape == shape]
-            )
-            shape_N_R_max = np.array(
-                [len(eigvals) / np.max(eigvals) for eigvals in shape_eigvalss]
-            )
+            is_shape = np.array([this_shape == shape for this_shape, _ in combinations])
+            shape_areas_tested = areas_tested[is_shape]
+            shape_N_R_max = N_R_max[is_shape]
 
-            slope = _calculate_slope(shape_N_R_max, shape_areas_tested)
-            r_squared = _calculate_rsquared(shape_N_R_max, shape_areas_tested)
+            slope = slope_through_origin(shape_N_R_max, shape_areas_tested)
+            r_squared = rsquared_through_origin(shape_N_R_max, shape_areas_tested)
             N_R_sample = np.linspace(np.min(shape_N_R_max), np.max(shape_N_R_max), 100)
 
             plt.plot(
@@ -120,8 +132,8 @@ def _plot_weyls_law_analog(
     else:
         plt.plot(N_R_max, areas_tested, "ko", markersize=5)
 
-    slope = _calculate_slope(N_R_max, areas_tested)
-    r_squared = _calculate_rsquared(N_R_max, areas_tested)
+    slope = slope_through_origin(N_R_max, areas_tested)
+    r_squared = rsquared_through_origin(N_R_max, areas_tested)
     N_R_sample = np.linspace(np.min(N_R_max), np.max(N_R_max), 100)
 
     plt.plot(N_R_sample, slope * N_R_sample, "r", label=f"Overall, slope={slope:.2f}")
@@ -130,7 +142,7 @@ def _plot_weyls_law_analog(
     # plt.title("Linear Relation between Area and N(R_max) / R_max")
     plt.legend()
     plt.tight_layout()
-    plt.savefig(f"{IMAGES_FOLDER}/weyls_law_analog_{test_id}.png", dpi=300)
+    plt.savefig(f"{images_folder()}/weyls_law_analog_{test_id}.png", dpi=300)
     plt.show()
 
     print(f"Overall slope: {slope}, R^2: {r_squared}")
@@ -144,20 +156,18 @@ def run_analysis(
     plot_N_R_behavior=True,
     plot_weyls_law_analog=True,
 ):
+    init_workspace()
     combinations = [(shape, area) for area in area_sampling for shape in shapes]
     areas_tested = np.array([combination[1] for combination in combinations])
 
-    eigvalss = []
-    for geometry_type, area in tqdm(combinations, desc="Test"):
-        eigvals = calculate_eigenvalues(geometry_type, area)
-        eigvalss.append(eigvals)
-
-    if plot_N_R_behavior:
+    if plot_N_R_behavior:  # needs the full spectra
+        eigvalss = calculate_eigenvalues_many(combinations)
         _plot_N_R_behavior(eigvalss, shapes, area_sampling, test_id=SCRIPT_NAME)
 
     if plot_weyls_law_analog:
+        N_R_max = calculate_N_R_max_many(combinations, test_id=SCRIPT_NAME)
         _plot_weyls_law_analog(
-            eigvalss,
+            N_R_max,
             areas_tested,
             shapes,
             area_sampling,
@@ -0,0 +1,65 @@
+import argparse
+import os
+
+from elastowaves_spectral_analysis.benchmarks import (
+    STAGES,
+    compare_to_baseline,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+from elastowaves_spectral_analysis.storage import benchmarks_folder
+
+RESULTS_FILE = "results.json"  # in the benchmarks folder of the data root
+BASELINE_FILE = "baseline.json"
+
+
+def print_results(results):
+    for module, record in results["imports"].items():
+        print(f"import {module}: {record['time']:.3f} s")
+        if record["heavy_modules"]:
+            print(f"  WARNING imports {', '.join(record['heavy_modules'])}")
+    for name, case in results["cases"].items():
+        print(f"{name}: neq={case['neq']}, nnz={case['nnz']}")
+        for stage in STAGES:
+            record = case["stages"][stage]
+            print(
+                f"  {stage:>13}: {record['time']:8.3f} s, "
+                f"{record['peak_memory'] / 2**20:8.1f} MiB"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each solve stage")
+    parser.add_argument(
+        "--results", default=os.path.join(benchmarks_folder(), RESULTS_FILE)
+    )
+    parser.add_argument(
+        "--baseline", default=os.path.join(benchmarks_folder(), BASELINE_FILE)
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+    print_results(results)
+    save_results(results, args.results)
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        regressions = compare_to_baseline(results, load_results(args.baseline))
+        for name, stage, metric, old, new in regressions:
+            print(f"REGRESSION {name} {stage} {metric}: {old:.4g} -> {new:.4g}")
+        if not regressions:
+            print("No regressions against the baseline")
+    else:
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+
+
+if __name__ == "__main__":
+    main()
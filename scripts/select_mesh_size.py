@@ -0,0 +1,25 @@
+from elastowaves_spectral_analysis.adaptive import select_mesh_size
+
+
+def main():
+    geometries = [
+        ("square", {"side": 1.0, "mesh_size": 0.2}),
+        ("circle", {"radius": 1.0, "mesh_size": 0.2}),
+        ("isospectral_1_1", {"mesh_size": 0.2}),
+    ]
+    n_modes = 10
+    rtol = 1e-3
+
+    for geometry_type, params in geometries:
+        result = select_mesh_size(geometry_type, params, n_modes=n_modes, rtol=rtol)
+        print(geometry_type, params)
+        for level in result["levels"]:
+            print(f"  mesh_size={level['mesh_size']:.4f}, neq={level['neq']}")
+        status = "converged" if result["converged"] else "NOT converged"
+        print(f"  chosen mesh_size={result['mesh_size']:.4f} ({status})")
+        if result["error"] is not None:
+            print(f"  max estimated error: {result['error'].max():.2e}")
+
+
+if __name__ == "__main__":
+    main()